@@ -43,3 +43,13 @@ class Mp3BansheeScaler(Scaler):
 class Mp3MusicBeeScaler(Mp3BansheeScaler):
     def __init__(self):
         super(Mp3MusicBeeScaler, self).__init__('MusicBee')
+
+
+class BansheeDatabaseScaler(Scaler):
+    """
+    scaler for the Rating column of the Banshee database (CoreTracks table)
+    which holds the number of stars: 0 (unrated) to 5.
+    """
+
+    def __init__(self):
+        super(BansheeDatabaseScaler, self).__init__('Banshee', max_value=5)
@@ -0,0 +1,14 @@
+from beetsplug.scaler import Scaler
+
+
+class ClementineDatabaseScaler(Scaler):
+    """
+    scaler for the rating column of the Clementine database (songs table)
+    which is a float between 0-1, -1 meaning unrated.
+    """
+
+    def __init__(self):
+        super(ClementineDatabaseScaler, self).__init__('Clementine', max_value=1)
+
+    def unscale(self, userrating_value):
+        return userrating_value / Scaler.MAX_ACCEPTED_VALUE
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+
+from urllib.parse import unquote_to_bytes, urlparse
+from urllib.request import pathname2url
+
+from beets.util import bytestring_path, normpath
+
+from beetsplug.banshee import BansheeDatabaseScaler
+from beetsplug.clementine import ClementineDatabaseScaler
+
+
+class PlayerDatabase(object):
+    """
+    Describe where a player keeps its ratings in its own SQLite database.
+
+    ``url_paths`` tells whether the paths are stored as ``file://`` URLs
+    rather than plain paths.
+    """
+
+    def __init__(self, table, id_column, path_column, rating_column, scaler,
+                 default_path=None, url_paths=False):
+        self.table = table
+        self.id_column = id_column
+        self.path_column = path_column
+        self.rating_column = rating_column
+        self.scaler = scaler
+        self.default_path = default_path
+        self.url_paths = url_paths
+
+    def normalize_path(self, path):
+        if isinstance(path, memoryview):
+            path = bytes(path)
+        path = bytestring_path(path)
+        if self.url_paths:
+            url = urlparse(path)
+            if url.scheme != b'file':
+                return None
+            path = unquote_to_bytes(url.path)
+        return normpath(path)
+
+    def read(self, db_path):
+        """
+        Yield ``(row id, normalized path, rating)`` for every rated track,
+        with the rating scaled to 0-10. The database is opened read-only.
+        """
+        connection = _connect_read_only(db_path)
+        try:
+            rows = connection.execute('SELECT {0}, {1}, {2} FROM {3} WHERE {2} > 0'.format(
+                self.id_column, self.path_column, self.rating_column, self.table))
+            for row_id, path, rating in rows:
+                path = self.normalize_path(path)
+                if path is not None:
+                    yield row_id, path, self.scaler.scale(rating)
+        finally:
+            connection.close()
+
+    def read_all(self, db_path):
+        """
+        Return a dict mapping the normalized path of every track to its row
+        id, rated or not.
+        """
+        connection = _connect_read_only(db_path)
+        try:
+            rows = connection.execute('SELECT {0}, {1} FROM {2}'.format(
+                self.id_column, self.path_column, self.table))
+            return {self.normalize_path(path): row_id for row_id, path in rows}
+        finally:
+            connection.close()
+
+    def write(self, db_path, ratings):
+        """
+        Store ``(row id, rating)`` pairs, with ratings between 0-10, in one
+        transaction.
+        """
+        connection = sqlite3.connect(db_path)
+        try:
+            with connection:
+                connection.executemany('UPDATE {0} SET {1} = ? WHERE {2} = ?'.format(
+                    self.table, self.rating_column, self.id_column),
+                    [(self.scaler.unscale(rating), row_id) for row_id, rating in ratings])
+        finally:
+            connection.close()
+
+
+def _connect_read_only(db_path):
+    return sqlite3.connect('file:{0}?mode=ro'.format(pathname2url(db_path)), uri=True)
+
+
+PLAYER_DATABASES = {
+    'clementine': PlayerDatabase('songs', 'ROWID', 'filename', 'rating', ClementineDatabaseScaler(),
+                                 default_path=os.path.expanduser('~/.config/Clementine/clementine.db'),
+                                 url_paths=True),
+    'banshee': PlayerDatabase('CoreTracks', 'TrackID', 'Uri', 'Rating', BansheeDatabaseScaler(),
+                              default_path=os.path.expanduser('~/.config/banshee-1/banshee.db'),
+                              url_paths=True),
+}
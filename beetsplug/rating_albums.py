@@ -0,0 +1,111 @@
+import collections
+
+# Album attributes holding the aggregates of the ratings of their tracks
+AGGREGATES = ('userrating_count', 'userrating_sum', 'userrating_max', 'userrating_mean')
+
+_RATED = 'CAST(attr.value AS INTEGER)'
+
+
+def _album_ids(tx, item_ids):
+    album_ids = {}
+    item_ids = list(item_ids)
+    for start in range(0, len(item_ids), 500):
+        batch = item_ids[start:start + 500]
+        album_ids.update(tx.query('SELECT id, album_id FROM items WHERE album_id IS NOT NULL '
+                                  'AND id IN ({0})'.format(', '.join('?' * len(batch))), batch))
+    return album_ids
+
+
+def _compute(tx, album_ids=None):
+    """
+    Return a dict mapping album ids to their rated track count, rating
+    sum and maximum, computed with one grouped query.
+    """
+    statement = ('SELECT items.album_id, COUNT(*), SUM({0}), MAX({0}) FROM items '
+                 'JOIN item_attributes attr ON attr.entity_id = items.id AND attr.key = \'userrating\' '
+                 'WHERE items.album_id IS NOT NULL AND {0} != 0').format(_RATED)
+    if album_ids is None:
+        rows = tx.query(statement + ' GROUP BY items.album_id')
+    else:
+        album_ids = list(album_ids)
+        rows = []
+        for start in range(0, len(album_ids), 500):
+            batch = album_ids[start:start + 500]
+            rows.extend(tx.query(statement + ' AND items.album_id IN ({0}) GROUP BY items.album_id'.format(
+                ', '.join('?' * len(batch))), batch))
+    return {album_id: [count, total, highest] for album_id, count, total, highest in rows}
+
+
+def _store(tx, aggregates):
+    for album_id, (count, total, highest) in aggregates.items():
+        tx.mutate('DELETE FROM album_attributes WHERE entity_id = ? AND key IN ({0})'.format(
+            ', '.join('?' * len(AGGREGATES))), (album_id,) + AGGREGATES)
+        if not count:
+            continue
+        for key, value in zip(AGGREGATES, (count, total, highest, round(float(total) / count, 2))):
+            tx.mutate('INSERT INTO album_attributes (entity_id, key, value) VALUES (?, ?, ?)',
+                      (album_id, key, value))
+
+
+def rebuild_album_ratings(lib):
+    """
+    Compute the rating aggregates of every album from scratch.
+    """
+    with lib.transaction() as tx:
+        aggregates = _compute(tx)
+        tx.mutate('DELETE FROM album_attributes WHERE key IN ({0})'.format(', '.join('?' * len(AGGREGATES))),
+                  AGGREGATES)
+        _store(tx, aggregates)
+    return len(aggregates)
+
+
+def update_album_ratings(lib, changes):
+    """
+    Update the aggregates of the albums of the items whose rating changed,
+    given as ``(item_id, old, new)`` once the new ratings are stored. The
+    running count and sum are adjusted by the changes; the maximum is only
+    recomputed when the best rated track of an album got a lower rating,
+    and albums without aggregates yet are computed from their tracks.
+    """
+    with lib.transaction() as tx:
+        album_ids = _album_ids(tx, set(item_id for item_id, _, _ in changes))
+        by_album = collections.defaultdict(list)
+        for item_id, old, new in changes:
+            if item_id in album_ids:
+                by_album[album_ids[item_id]].append((old or 0, new or 0))
+        if not by_album:
+            return
+
+        current = collections.defaultdict(dict)
+        batch = list(by_album)
+        for start in range(0, len(batch), 500):
+            ids = batch[start:start + 500]
+            rows = tx.query('SELECT entity_id, key, value FROM album_attributes WHERE key IN ({0}) '
+                            'AND entity_id IN ({1})'.format(', '.join('?' * len(AGGREGATES)),
+                                                             ', '.join('?' * len(ids))), AGGREGATES + tuple(ids))
+            for album_id, key, value in rows:
+                current[album_id][key] = value
+
+        aggregates = {}
+        stale = []
+        for album_id, album_changes in by_album.items():
+            if 'userrating_count' not in current[album_id]:
+                stale.append(album_id)
+                continue
+            count = int(current[album_id]['userrating_count'])
+            total = int(current[album_id]['userrating_sum'])
+            highest = int(current[album_id]['userrating_max'])
+            lowered = False
+            for old, new in album_changes:
+                count += bool(new) - bool(old)
+                total += new - old
+                lowered = lowered or (old == highest and new < old)
+                highest = max(highest, new)
+            if lowered:
+                stale.append(album_id)
+            else:
+                aggregates[album_id] = [count, total, highest]
+
+        computed = _compute(tx, stale)
+        aggregates.update((album_id, computed.get(album_id, [0, 0, 0])) for album_id in stale)
+        _store(tx, aggregates)
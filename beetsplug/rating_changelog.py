@@ -0,0 +1,87 @@
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: entries are written unlocked
+    fcntl = None
+
+
+class ChangeLog(object):
+    """
+    An append-only log of the rating changes, one JSON object per line
+    with the item id, the old and new ratings, the time and the source of
+    the change, and the offset of the entry in the log.
+
+    Each entry is written as soon as it is recorded, under an exclusive
+    lock, so concurrent runs (an import and ``--watch``) never interleave
+    their entries and the offsets always increase along the log: the
+    offset of the last change read is the watermark to read the next ones
+    from. The times come from the clock when the entry is written and can
+    go backwards if the clock is set back.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def record(self, item_id, old, new, source, now=None):
+        if old == new:
+            return
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            self._file = open(self.path, 'ab')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            self._file.seek(0, os.SEEK_END)
+            self._file.write(json.dumps({
+                'id': item_id,
+                'old': old,
+                'new': new,
+                'time': time.time() if now is None else now,
+                'source': source,
+                'offset': self._file.tell(),
+            }).encode('ascii') + b'\n')
+            self._file.flush()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read(self, offset=None):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            if offset is not None:
+                # Skip the entry at offset, already read
+                f.seek(offset)
+                f.readline()
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Being written
+                    break
+                yield json.loads(line)
+
+    def since(self, timestamp):
+        """
+        Yield the changes made after ``timestamp``, in log order.
+        """
+        for change in self._read():
+            if change['time'] > timestamp:
+                yield change
+
+    def after(self, offset):
+        """
+        Yield the changes logged after the one at ``offset``, oldest first.
+        """
+        for change in self._read(offset):
+            yield change
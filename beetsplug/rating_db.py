@@ -0,0 +1,123 @@
+_RATED = 'CAST(own.value AS INTEGER)'
+_EXTERNAL = 'CAST(external.value AS INTEGER)'
+
+
+def item_ids_by_path(lib):
+    """
+    Return a dict mapping the path of every item to its id, in one query.
+    """
+    with lib.transaction() as tx:
+        return {bytes(path): item_id for item_id, path in tx.query('SELECT id, path FROM items')}
+
+
+def item_id_by_path(lib, path):
+    """
+    Return the id of the item at ``path``, or None if it is not in the
+    library.
+    """
+    with lib.transaction() as tx:
+        rows = tx.query('SELECT id FROM items WHERE path = ?', (path,))
+    return rows[0][0] if rows else None
+
+
+def last_item_id(lib):
+    """
+    Return the highest item id, which grows as items are added.
+    """
+    with lib.transaction() as tx:
+        return tx.query('SELECT MAX(id) FROM items')[0][0]
+
+
+def item_ratings(lib, key='userrating', item_ids=None, convert=int):
+    """
+    Return a dict mapping item ids to their ``key`` rating, in one query
+    for the whole library or one per 500 of ``item_ids``.
+    """
+    statement = 'SELECT entity_id, value FROM item_attributes WHERE key = ?'
+    if item_ids is None:
+        batches = [[]]
+    else:
+        item_ids = list(item_ids)
+        batches = [item_ids[start:start + 500] for start in range(0, len(item_ids), 500)]
+    ratings = {}
+    with lib.transaction() as tx:
+        for batch in batches:
+            rows = tx.query(statement + (' AND entity_id IN ({0})'.format(', '.join('?' * len(batch)))
+                                         if item_ids is not None else ''), [key] + batch)
+            ratings.update((item_id, convert(value)) for item_id, value in rows if value is not None)
+    return ratings
+
+
+def store_ratings(lib, ratings, key='userrating', batch_size=1000):
+    """
+    Store ``(item id, rating)`` pairs as the ``key`` attribute, committing
+    one transaction per ``batch_size`` items.
+    """
+    ratings = list(ratings)
+    for start in range(0, len(ratings), batch_size):
+        with lib.transaction() as tx:
+            for item_id, rating in ratings[start:start + batch_size]:
+                tx.mutate('INSERT INTO item_attributes (entity_id, key, value) VALUES (?, ?, ?)',
+                          (item_id, key, rating))
+
+
+def rating_stats(lib, field):
+    """
+    Yield rating statistics for every value of the ``field`` item column,
+    computed with one aggregate query: number of tracks, of rated tracks,
+    of tracks only rated by other players, mean rating and the number of
+    tracks for each rating value.
+    """
+    histogram = ', '.join('SUM(CASE WHEN {0} = {1} THEN 1 ELSE 0 END)'.format(_RATED, rating)
+                          for rating in range(1, 11))
+    statement = ('SELECT items.{0}, COUNT(*), '
+                 'SUM(CASE WHEN {1} != 0 THEN 1 ELSE 0 END), '
+                 'SUM(CASE WHEN IFNULL({1}, 0) = 0 AND {2} != 0 THEN 1 ELSE 0 END), '
+                 'AVG(NULLIF({1}, 0)), {3} '
+                 'FROM items '
+                 'LEFT JOIN item_attributes own ON own.entity_id = items.id AND own.key = \'userrating\' '
+                 'LEFT JOIN item_attributes external '
+                 'ON external.entity_id = items.id AND external.key = \'externalrating\' '
+                 'GROUP BY items.{0} ORDER BY items.{0}').format(field, _RATED, _EXTERNAL, histogram)
+    with lib.transaction() as tx:
+        rows = tx.query(statement)
+    for row in rows:
+        yield {
+            field: row[0],
+            'tracks': row[1],
+            'rated': row[2],
+            'external_only': row[3],
+            'mean': row[4],
+            'histogram': {rating: count for rating, count in zip(range(1, 11), row[5:]) if count},
+        }
+
+
+def list_ratings(lib, where=None, subvals=(), min_rating=None, max_rating=None, unrated=False,
+                 external_only=False):
+    """
+    Yield the id, path, artist, title, rating and external rating of the
+    items matching the ``where`` clause on the items table and the rating
+    filters, all evaluated in one query. A 0 rating counts as no rating.
+    """
+    conditions = [where] if where else []
+    subvals = list(subvals)
+    if unrated or external_only:
+        conditions.append('IFNULL({0}, 0) = 0'.format(_RATED))
+    if external_only:
+        conditions.append('{0} != 0'.format(_EXTERNAL))
+    if min_rating is not None:
+        conditions.append('{0} >= ?'.format(_RATED))
+        subvals.append(min_rating)
+    if max_rating is not None:
+        conditions.append('{0} BETWEEN 1 AND ?'.format(_RATED))
+        subvals.append(max_rating)
+    statement = ('SELECT items.id, items.path, items.artist, items.title, '
+                 'NULLIF({0}, 0), NULLIF({1}, 0) FROM items '
+                 'LEFT JOIN item_attributes own ON own.entity_id = items.id AND own.key = \'userrating\' '
+                 'LEFT JOIN item_attributes external '
+                 'ON external.entity_id = items.id AND external.key = \'externalrating\' '
+                 'WHERE {2} ORDER BY items.id').format(_RATED, _EXTERNAL, ' AND '.join(conditions) or '1')
+    with lib.transaction() as tx:
+        rows = tx.query(statement, subvals)
+    for item_id, path, artist, title, rating, external in rows:
+        yield item_id, bytes(path), artist, title, rating, external
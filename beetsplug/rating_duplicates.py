@@ -0,0 +1,49 @@
+import collections
+
+# Item columns identifying copies of the same recording, tried in order
+DUPLICATE_KEYS = {
+    'mb_trackid': ('mb_trackid',),
+    'acoustid_id': ('acoustid_id',),
+    'artist_title_length': ('artist', 'title', 'length'),
+}
+
+# How the rating of a group of copies is chosen from their ratings
+WINNER_POLICIES = {
+    'max': max,
+    'min': min,
+    'mean': lambda ratings: int(round(float(sum(ratings)) / len(ratings))),
+    'most_common': lambda ratings: collections.Counter(ratings).most_common(1)[0][0],
+}
+
+
+def _key(row, columns):
+    values = tuple(row[column] for column in columns)
+    if not all(values):
+        return None
+    if 'length' in columns:
+        # Transcodes differ by a fraction of a second
+        values = tuple(int(round(value)) if column == 'length' else value.lower()
+                       for column, value in zip(columns, values))
+    return values
+
+
+def duplicate_groups(lib, keys):
+    """
+    Return the lists of ids of the items sharing a value of the first of
+    the ``keys`` they have a value for, for the groups with more than one
+    item. A later key is a fallback, only used for the items without a
+    value for the keys before it, so that items with different values of
+    a key are never grouped. One query and one pass over the library.
+    """
+    columns = sorted(set(column for key in keys for column in DUPLICATE_KEYS[key]))
+    with lib.transaction() as tx:
+        rows = tx.query('SELECT id, {0} FROM items'.format(', '.join(columns)))
+
+    groups = collections.defaultdict(list)
+    for row in rows:
+        for key in keys:
+            value = _key(row, DUPLICATE_KEYS[key])
+            if value is not None:
+                groups[key, value].append(row['id'])
+                break
+    return sorted(sorted(group) for group in groups.values() if len(group) > 1)
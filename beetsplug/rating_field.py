@@ -0,0 +1,71 @@
+import mediafile
+
+# The mutagen file types of the beets item formats
+FORMAT_TYPES = {
+    'MP3': 'MP3',
+    'AAC': 'MP4',
+    'ALAC': 'MP4',
+    'OGG': 'OggVorbis',
+    'Opus': 'OggOpus',
+    'FLAC': 'FLAC',
+    'APE': 'MonkeysAudio',
+    'WavPack': 'WavPack',
+    'Musepack': 'Musepack',
+    'Windows Media': 'ASF',
+    'AIFF': 'AIFF',
+    'DSD Stream File': 'DSF',
+    'WAVE': 'WAVE',
+}
+
+
+class RatingField(mediafile.MediaField):
+    """
+    The ``userrating`` or ``externalrating`` media field.
+
+    The storage styles, and the mutagen frames and scaler tables they
+    depend on, are only imported and built when a rating is first read
+    from or written to a file, so that commands which never touch the
+    ratings of files do not pay for them.
+    """
+
+    def __init__(self, is_external, log):
+        super(RatingField, self).__init__(out_type=int)
+        self._is_external = is_external
+        self._log = log
+
+    def styles(self, mutagen_file):
+        if not self._styles:
+            self._styles = self._build_styles()
+        return super(RatingField, self).styles(mutagen_file)
+
+    def writable_formats(self):
+        """
+        Return the set of item formats in which a storage style can write
+        the rating. Formats only handled by the ``DefaultValueStorageStyle``
+        placeholder, or by no style at all, cannot store ratings.
+        """
+        from .rating_styles import DefaultValueStorageStyle
+
+        if not self._styles:
+            self._styles = self._build_styles()
+        types = set(file_type for style in self._styles
+                    if not style.read_only and not isinstance(style, DefaultValueStorageStyle)
+                    for file_type in style.formats)
+        return set(item_format for item_format, file_type in FORMAT_TYPES.items() if file_type in types)
+
+    def _build_styles(self):
+        from .rating_styles import (AmarokRatingStorageStyle, ASFRatingStorageStyle, DefaultValueStorageStyle,
+                                    MP3UserRatingStorageStyle, MP4RatingStorageStyle, UserRatingStorageStyle,
+                                    VorbisRatingStorageStyle)
+
+        # Given the complexity of the storage style implementations, I
+        # find it handy to allow them to do unified logging.
+        return (
+            AmarokRatingStorageStyle(_log=self._log, _is_external=self._is_external),
+            MP3UserRatingStorageStyle(_log=self._log, _is_external=self._is_external),
+            UserRatingStorageStyle(_log=self._log, _is_external=self._is_external),
+            ASFRatingStorageStyle(_log=self._log, _is_external=self._is_external),
+            MP4RatingStorageStyle(_log=self._log, _is_external=self._is_external),
+            VorbisRatingStorageStyle(_log=self._log, _is_external=self._is_external),
+            DefaultValueStorageStyle(_log=self._log, _is_external=True),
+        )
@@ -0,0 +1,72 @@
+import csv
+import io
+import os
+
+from beets.util import bytestring_path, displayable_path, normpath
+
+from .scaler import Scaler
+
+RATING_TAG = b'#EXT-X-RATING:'
+
+
+def read_ratings_file(path, log):
+    """
+    Stream ``(item path, rating)`` pairs out of a ratings file.
+
+    ``.m3u``/``.m3u8`` files are playlists using the ``#EXT-X-RATING:<n>``
+    tag (n is 1-5, as written by ``ratingsfile``), anything else is a
+    ``path,rating`` CSV list (tab separated for ``.tsv``) with ratings
+    between 0-10. Relative paths are resolved against the file directory.
+    Invalid ratings are skipped with a warning.
+    """
+    path = bytestring_path(path)
+    base_dir = os.path.dirname(normpath(path))
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (b'.m3u', b'.m3u8'):
+        entries = _read_playlist(path, log)
+    else:
+        entries = _read_csv(path, '\t' if extension == b'.tsv' else ',', log)
+    for item_path, rating in entries:
+        yield normpath(os.path.join(base_dir, item_path)), rating
+
+
+def _parse_rating(value, scale=1):
+    """
+    Return the rating ``value`` times ``scale``, or None if it is not a
+    number between 0 and ``Scaler.MAX_ACCEPTED_VALUE``.
+    """
+    try:
+        rating = int(value) * scale
+    except ValueError:
+        return None
+    return rating if 0 <= rating <= Scaler.MAX_ACCEPTED_VALUE else None
+
+
+def _read_playlist(path, log):
+    rating = None
+    with open(path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if line.startswith(RATING_TAG):
+                rating = _parse_rating(line[len(RATING_TAG):], 2)
+                if rating is None:
+                    log.warning(u'{0}:{1}: skipping invalid rating {2}', displayable_path(path), number,
+                                displayable_path(line))
+            elif line and not line.startswith(b'#'):
+                if rating is not None:
+                    yield line, rating
+                rating = None
+
+
+def _read_csv(path, delimiter, log):
+    with io.open(path, 'r', encoding='utf-8', newline='') as f:
+        for number, row in enumerate(csv.reader(f, delimiter=delimiter), 1):
+            if len(row) < 2:
+                continue
+            rating = _parse_rating(row[1])
+            if rating is None:
+                # Unless it is the header line
+                if number > 1:
+                    log.warning(u'{0}:{1}: skipping invalid rating {2}', displayable_path(path), number, row[1])
+                continue
+            yield bytestring_path(row[0]), rating
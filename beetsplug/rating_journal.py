@@ -0,0 +1,103 @@
+import json
+import os
+
+
+class RatingJournal(object):
+    """
+    An append-only journal for long running bulk rating jobs.
+
+    The first line holds the job parameters as JSON, every following
+    line is the id of an item that has been completely handled. The
+    file is fsync'ed every ``sync_interval`` entries so that at most
+    that many items have to be handled again after a crash.
+    """
+
+    def __init__(self, path, sync_interval=100):
+        self.path = path
+        self.sync_interval = sync_interval
+        self.params = None
+        self.completed = set()
+        self._file = None
+        self._pending = 0
+        # Size of the complete lines read by load
+        self._end = 0
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def load(self):
+        """
+        Read back the job parameters and the completed item ids.
+
+        A truncated last line (the job died while writing it) is ignored,
+        and None is returned if the header itself is truncated.
+        """
+        self.params = None
+        self.completed = set()
+        self._end = 0
+        with open(self.path, 'rb') as f:
+            header = f.readline()
+            if not header.endswith(b'\n'):
+                return None
+            self.params = json.loads(header)
+            self._end = len(header)
+            for line in f:
+                if line.endswith(b'\n'):
+                    self.completed.add(int(line))
+                    self._end += len(line)
+        return self.params
+
+    def start(self, params):
+        """
+        Start a new job, discarding any previous journal.
+        """
+        self.params = params
+        self.completed = set()
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._file = open(self.path, 'w')
+        self._file.write(json.dumps(params, sort_keys=True) + '\n')
+        self._sync()
+
+    def resume(self):
+        """
+        Reopen an existing journal to append to it, after its last complete
+        line. Return None, without reopening it, if its header is truncated.
+        """
+        if self.load() is None:
+            return None
+        os.truncate(self.path, self._end)
+        self._file = open(self.path, 'a')
+        return self.params
+
+    def is_done(self, item_id):
+        return item_id in self.completed
+
+    def record(self, item_id):
+        self._file.write('%d\n' % item_id)
+        self.completed.add(item_id)
+        self._pending += 1
+        if self._pending >= self.sync_interval:
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def compact(self):
+        """
+        Close a completed job. Nothing is left to resume, so the journal
+        is dropped altogether.
+        """
+        self.close()
+        if self.exists():
+            os.remove(self.path)
+        self.completed = set()
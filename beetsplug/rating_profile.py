@@ -0,0 +1,36 @@
+import cProfile
+import contextlib
+import linecache
+import tracemalloc
+
+
+@contextlib.contextmanager
+def profiled(log, path=None, memory=False, top=10):
+    """
+    Run the body under cProfile, writing the statistics to ``path`` for
+    ``pstats`` or ``snakeviz``, and/or under tracemalloc, logging the peak
+    memory and the ``top`` allocation sites.
+    """
+    profile = None
+    if path:
+        profile = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(path)
+            log.info(u'Wrote profile to {0}', path)
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            log.info(u'Peak memory: {0:.1f} MiB', peak / 1048576.0)
+            for stat in snapshot.statistics('lineno')[:top]:
+                frame = stat.traceback[0]
+                log.info(u'{0:.1f} KiB in {1} blocks at {2}:{3}: {4}', stat.size / 1024.0, stat.count,
+                         frame.filename, frame.lineno, linecache.getline(frame.filename, frame.lineno).strip())
@@ -0,0 +1,42 @@
+import time
+
+from beets import ui
+
+# Outcomes of handling one track
+WRITTEN = 'written'
+SKIPPED = 'skipped'
+
+
+class Progress(object):
+    """
+    Count the processed, skipped and written tracks of a bulk job and log
+    the throughput and the estimated time left every ``interval`` seconds,
+    instead of logging every track.
+    """
+
+    def __init__(self, log, total, interval=5.0, clock=time.time):
+        self._log = log
+        self.total = total
+        self.interval = interval
+        self._clock = clock
+        self.processed = self.skipped = self.written = 0
+        self.started = self._reported = clock()
+
+    def update(self, outcome=None):
+        self.processed += 1
+        if outcome == WRITTEN:
+            self.written += 1
+        elif outcome == SKIPPED:
+            self.skipped += 1
+        now = self._clock()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            self.report(now)
+
+    def report(self, now=None):
+        elapsed = (self._clock() if now is None else now) - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        left = max(self.total - self.processed, 0)
+        self._log.info(u'{0}/{1} processed, {2} skipped, {3} written, {4:.0f} items/s, ETA {5}',
+                       self.processed, self.total, self.skipped, self.written, rate,
+                       ui.human_seconds_short(left / rate) if rate else u'?')
@@ -0,0 +1,82 @@
+from beets import config
+from beets.dbcore import query
+
+# Fields whose queries can be answered by the rating indexes
+RATING_FIELDS = ('userrating', 'externalrating')
+
+
+def rating_index_enabled():
+    return config['userrating']['index'].get(bool)
+
+
+def create_rating_indexes(lib):
+    """
+    Create partial expression indexes on the integer value of the rating
+    attributes. SQLite keeps them in sync with ``item_attributes``, however
+    the ratings are stored.
+    """
+    with lib.transaction() as tx:
+        tx.script(''.join(
+            'CREATE INDEX IF NOT EXISTS item_attributes_by_{0} '
+            'ON item_attributes (CAST(value AS INTEGER)) '
+            'WHERE key = \'{0}\';\n'.format(field) for field in RATING_FIELDS))
+
+
+def _rated_items(field):
+    # Must match the indexed expression and partial index condition
+    return ('SELECT entity_id FROM item_attributes '
+            'WHERE key = \'{0}\' AND CAST(value AS INTEGER) != 0'.format(field))
+
+
+class RatingQuery(query.NumericQuery):
+    """
+    Numeric query on a rating attribute.
+
+    Tracks without a rating never match. With the ``index`` option the
+    query is answered in SQL through the rating indexes instead of loading
+    every item, and a 0 rating counts as no rating.
+    """
+
+    def clause(self):
+        if self.field not in RATING_FIELDS or not rating_index_enabled():
+            return super(RatingQuery, self).clause()
+        subquery = _rated_items(self.field)
+        if self.point is not None:
+            subquery += ' AND CAST(value AS INTEGER) = ?'
+            subvals = (self.point,)
+        else:
+            subvals = ()
+            if self.rangemin is not None:
+                subquery += ' AND CAST(value AS INTEGER) >= ?'
+                subvals += (self.rangemin,)
+            if self.rangemax is not None:
+                subquery += ' AND CAST(value AS INTEGER) <= ?'
+                subvals += (self.rangemax,)
+        return 'id IN ({0})'.format(subquery), subvals
+
+    def match(self, item):
+        value = item.get(self.field)
+        if value is None or (value == 0 and rating_index_enabled()):
+            return False
+        return super(RatingQuery, self).match(item)
+
+
+class UserRatingSort(query.FieldSort):
+    """
+    Sort on ``userrating``, unrated tracks first, done in SQL with the
+    ``index`` option.
+    """
+
+    def __init__(self, model_cls, ascending=True, case_insensitive=True):
+        super(UserRatingSort, self).__init__('userrating', ascending, case_insensitive)
+
+    def order_clause(self):
+        return ('(SELECT NULLIF(CAST(value AS INTEGER), 0) FROM item_attributes '
+                'WHERE entity_id = items.id AND key = \'userrating\') {0}'
+                ).format('ASC' if self.ascending else 'DESC')
+
+    def is_slow(self):
+        return not rating_index_enabled()
+
+    def sort(self, objs):
+        return sorted(objs, key=lambda item: item.get(self.field) or 0, reverse=not self.ascending)
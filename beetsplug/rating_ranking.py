@@ -0,0 +1,101 @@
+TABLE = 'userrating_ranking'
+
+# Item fields the ranking can be grouped by, and their column
+GROUP_COLUMNS = {'artist': 'artist', 'album': 'album_id'}
+
+
+def _has_table(tx):
+    return bool(tx.query('SELECT name FROM sqlite_master WHERE type = \'table\' AND name = ?', (TABLE,)))
+
+
+def _populate(tx, where='1', subvals=()):
+    tx.mutate('INSERT INTO {0} (item_id, rating, artist, album_id) '
+              'SELECT items.id, CAST(attr.value AS INTEGER), items.artist, items.album_id '
+              'FROM items JOIN item_attributes attr '
+              'ON attr.entity_id = items.id AND attr.key = \'userrating\' '
+              'WHERE CAST(attr.value AS INTEGER) != 0 AND {1}'.format(TABLE, where), subvals)
+
+
+def ensure_ranking(lib, rebuild=False):
+    """
+    Create the ranking table, with one row per rated track ordered by
+    rating overall and by artist and album, and fill it if it is new or
+    ``rebuild`` is set.
+    """
+    with lib.transaction() as tx:
+        if _has_table(tx):
+            if not rebuild:
+                return
+            tx.script('DROP TABLE {0};'.format(TABLE))
+        tx.script('CREATE TABLE {0} (item_id INTEGER PRIMARY KEY, rating INTEGER, '
+                  'artist TEXT, album_id INTEGER);\n'
+                  'CREATE INDEX {0}_by_rating ON {0} (rating DESC);\n'
+                  'CREATE INDEX {0}_by_artist ON {0} (artist, rating DESC);\n'
+                  'CREATE INDEX {0}_by_album ON {0} (album_id, rating DESC);\n'.format(TABLE))
+        _populate(tx)
+
+
+def update_ranking(lib, item):
+    """
+    Update the ranking of one stored item.
+    """
+    rating = item.get('userrating')
+    with lib.transaction() as tx:
+        if rating:
+            tx.mutate('INSERT OR REPLACE INTO {0} (item_id, rating, artist, album_id) '
+                      'VALUES (?, ?, ?, ?)'.format(TABLE), (item.id, rating, item.artist, item.album_id))
+        else:
+            tx.mutate('DELETE FROM {0} WHERE item_id = ?'.format(TABLE), (item.id,))
+
+
+def update_ranking_ids(lib, item_ids, batch_size=500):
+    """
+    Update the ranking of items whose rating was stored in bulk.
+    """
+    item_ids = list(item_ids)
+    for start in range(0, len(item_ids), batch_size):
+        batch = item_ids[start:start + batch_size]
+        ids = ', '.join('?' * len(batch))
+        with lib.transaction() as tx:
+            tx.mutate('DELETE FROM {0} WHERE item_id IN ({1})'.format(TABLE, ids), batch)
+            _populate(tx, 'items.id IN ({0})'.format(ids), batch)
+
+
+def remove_from_ranking(lib, item_id):
+    with lib.transaction() as tx:
+        tx.mutate('DELETE FROM {0} WHERE item_id = ?'.format(TABLE), (item_id,))
+
+
+def rated_paths(lib, min_rating, max_rating=None):
+    """
+    Yield the paths of the tracks rated between ``min_rating`` and
+    ``max_rating``, best first.
+    """
+    statement = 'SELECT items.path FROM {0} JOIN items ON items.id = {0}.item_id WHERE rating >= ?'.format(TABLE)
+    subvals = (min_rating,)
+    if max_rating is not None:
+        statement += ' AND rating <= ?'
+        subvals += (max_rating,)
+    with lib.transaction() as tx:
+        rows = tx.query(statement + ' ORDER BY rating DESC', subvals)
+    for row in rows:
+        yield bytes(row[0])
+
+
+def top_paths(lib, count, group, min_rating=1):
+    """
+    Yield the paths of the ``count`` best rated tracks of every artist or
+    album, best first within each group, in one query: the tracks are
+    numbered within their group by a window function walking the
+    ``(group, rating DESC)`` index. Needs SQLite 3.25 or later.
+    """
+    column = GROUP_COLUMNS[group]
+    with lib.transaction() as tx:
+        rows = tx.query('SELECT items.path FROM ('
+                        'SELECT item_id, {1}, ROW_NUMBER() OVER (PARTITION BY {1} ORDER BY rating DESC) AS place '
+                        'FROM {0} WHERE {1} IS NOT NULL AND rating >= ?) ranked '
+                        'JOIN items ON items.id = ranked.item_id '
+                        'WHERE place <= ? ORDER BY ranked.{1}, place'.format(TABLE, column),
+                        (min_rating, count))
+    for row in rows:
+        yield bytes(row[0])
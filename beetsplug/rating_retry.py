@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+
+class RetryQueue(object):
+    """
+    A persistent queue of items whose rating could not be written to
+    their file (read-only, locked by a player, offline share...).
+
+    Each entry keeps the reason of the last failure, the number of
+    attempts and the time before which it should not be retried, doubling
+    the delay after every failed attempt.
+    """
+
+    def __init__(self, path, backoff=60, max_backoff=86400):
+        self.path = path
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.entries = {}
+        self._dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.entries = {int(item_id): entry for item_id, entry in json.load(f).items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item_id):
+        return item_id in self.entries
+
+    def add(self, item_id, reason, now=None):
+        now = time.time() if now is None else now
+        entry = self.entries.get(item_id, {'attempts': 0})
+        entry['attempts'] += 1
+        entry['reason'] = reason
+        entry['next_attempt'] = now + min(self.backoff * 2 ** (entry['attempts'] - 1), self.max_backoff)
+        self.entries[item_id] = entry
+        self._dirty = True
+
+    def remove(self, item_id):
+        if self.entries.pop(item_id, None) is not None:
+            self._dirty = True
+
+    def due(self, now=None):
+        """
+        Return the ids of the items whose backoff delay has expired.
+        """
+        now = time.time() if now is None else now
+        return sorted(item_id for item_id, entry in self.entries.items() if entry['next_attempt'] <= now)
+
+    def save(self):
+        if not self._dirty:
+            return
+        if not self.entries:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        else:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({str(item_id): entry for item_id, entry in self.entries.items()}, f)
+            os.replace(tmp_path, self.path)
+        self._dirty = False
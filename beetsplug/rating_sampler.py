@@ -0,0 +1,119 @@
+import heapq
+import random
+
+from .rating_db import item_ratings
+
+
+class AliasTable(object):
+    """
+    Walker's alias method: after an O(n) setup, draws an index with
+    probability proportional to its weight in O(1).
+    """
+
+    def __init__(self, weights):
+        count = len(weights)
+        total = float(sum(weights))
+        if not count or total <= 0:
+            raise ValueError(u'nothing to sample from')
+        self.probability = [0.0] * count
+        self.alias = [0] * count
+        scaled = [weight * count / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Only rounding errors are left
+        for i in small + large:
+            self.probability[i] = 1.0
+
+    def __len__(self):
+        return len(self.probability)
+
+    def draw(self, rng=random):
+        i = int(rng.random() * len(self.probability))
+        return i if rng.random() < self.probability[i] else self.alias[i]
+
+
+class RatingSampler(object):
+    """
+    Draw library items at random, weighted by their rating.
+
+    ``weights`` maps ratings to weights, and ``unrated_weight`` applies to
+    the tracks without a rating. The alias table is only built on the
+    first draw after ``invalidate`` has been called.
+    """
+
+    def __init__(self, lib, weights, unrated_weight=0):
+        self.lib = lib
+        self.weights = weights
+        self.unrated_weight = unrated_weight
+        self._item_ids = None
+        self._weights = None
+        self._total = 0.0
+        self._table = None
+
+    def invalidate(self):
+        self._table = None
+
+    def _build(self):
+        ratings = item_ratings(self.lib)
+        if self.unrated_weight:
+            with self.lib.transaction() as tx:
+                item_ids = [row[0] for row in tx.query('SELECT id FROM items')]
+        else:
+            item_ids = list(ratings)
+        weights = []
+        self._item_ids = []
+        for item_id in item_ids:
+            rating = ratings.get(item_id)
+            weight = self.weights.get(rating, 0) if rating else self.unrated_weight
+            if weight > 0:
+                self._item_ids.append(item_id)
+                weights.append(weight)
+        self._weights = weights
+        self._total = float(sum(weights))
+        self._table = AliasTable(weights)
+
+    def __len__(self):
+        if self._table is None:
+            self._build()
+        return len(self._table)
+
+    def draw(self, rng=random):
+        """
+        Return the id of a random item.
+        """
+        if self._table is None:
+            self._build()
+        return self._item_ids[self._table.draw(rng)]
+
+    def sample(self, count, rng=random):
+        """
+        Return the ids of ``count`` distinct random items. They are drawn
+        from the alias table, drawing again when an item was already
+        picked. Once half of the total weight has been picked, repeats get
+        likely, and the remaining items are drawn without replacement in
+        one pass (Efraimidis-Spirakis): each gets the key
+        ``u ** (1 / weight)`` for a uniform ``u``, the largest keys win.
+        """
+        if self._table is None:
+            self._build()
+        count = min(count, len(self._item_ids))
+        picked = set()
+        indexes = []
+        mass = 0.0
+        while len(indexes) < count and mass * 2 < self._total:
+            i = self._table.draw(rng)
+            if i not in picked:
+                picked.add(i)
+                indexes.append(i)
+                mass += self._weights[i]
+        if len(indexes) < count:
+            keyed = ((rng.random() ** (1.0 / weight), i) for i, weight in enumerate(self._weights)
+                     if i not in picked)
+            indexes.extend(i for _, i in heapq.nlargest(count - len(indexes), keyed))
+        return [self._item_ids[i] for i in indexes]
@@ -0,0 +1,85 @@
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Attributes blended in the score: ours and the ones maintained by mpdstats
+FEATURES = ('userrating', 'rating', 'play_count', 'skip_count')
+
+DEFAULT_WEIGHTS = {'userrating': 0.6, 'rating': 0.2, 'play_count': 0.2, 'skip_count': -0.2}
+
+
+def load_features(lib, item_ids=None):
+    """
+    Load the score features of ``item_ids`` (or of the whole library) in one
+    query. Return the item ids and a list of values, None when missing, for
+    every feature, in the same order.
+    """
+    with lib.transaction() as tx:
+        if item_ids is None:
+            item_ids = [row[0] for row in tx.query('SELECT id FROM items')]
+            rows = tx.query('SELECT entity_id, key, value FROM item_attributes WHERE key IN ({0})'.format(
+                ', '.join('?' * len(FEATURES))), FEATURES)
+        else:
+            item_ids = list(item_ids)
+            rows = []
+            for start in range(0, len(item_ids), 500):
+                batch = item_ids[start:start + 500]
+                rows.extend(tx.query('SELECT entity_id, key, value FROM item_attributes '
+                                     'WHERE key IN ({0}) AND entity_id IN ({1})'.format(
+                                         ', '.join('?' * len(FEATURES)), ', '.join('?' * len(batch))),
+                                     FEATURES + tuple(batch)))
+        max_play_count = tx.query('SELECT MAX(CAST(value AS INTEGER)) FROM item_attributes '
+                                  'WHERE key = \'play_count\'')[0][0] or 0
+    positions = {item_id: i for i, item_id in enumerate(item_ids)}
+    columns = {feature: [None] * len(item_ids) for feature in FEATURES}
+    for item_id, key, value in rows:
+        if value is not None:
+            columns[key][positions[item_id]] = float(value)
+    return item_ids, columns, max_play_count
+
+
+def blend_scores(columns, max_play_count, weights):
+    """
+    Compute the weighted sum of the normalized features, all between 0-1:
+    userrating / 10 and the mpdstats rating (0.5 when missing), the play
+    count on a log scale relative to the most played track and the ratio
+    of skips over plays. Uses NumPy when available.
+    """
+    if numpy is not None:
+        return _blend_numpy(columns, max_play_count, weights)
+    return _blend_python(columns, max_play_count, weights)
+
+
+def _blend_numpy(columns, max_play_count, weights):
+    def column(feature, missing):
+        values = numpy.array(columns[feature], dtype=float)
+        values[numpy.isnan(values)] = missing
+        return values
+
+    plays = column('play_count', 0.0)
+    skips = column('skip_count', 0.0)
+    features = {
+        'userrating': column('userrating', 5.0) / 10.0,
+        'rating': column('rating', 0.5),
+        'play_count': numpy.log1p(plays) / math.log1p(max_play_count) if max_play_count else plays * 0.0,
+        'skip_count': numpy.divide(skips, plays + skips, out=numpy.zeros_like(skips), where=plays + skips > 0),
+    }
+    scores = sum(weights.get(feature, 0.0) * values for feature, values in features.items())
+    return [round(float(score), 4) for score in scores]
+
+
+def _blend_python(columns, max_play_count, weights):
+    play_scale = math.log1p(max_play_count) if max_play_count else None
+    scores = []
+    for userrating, rating, plays, skips in zip(*(columns[feature] for feature in FEATURES)):
+        plays = plays or 0.0
+        skips = skips or 0.0
+        score = (weights.get('userrating', 0.0) * (5.0 if userrating is None else userrating) / 10.0
+                 + weights.get('rating', 0.0) * (0.5 if rating is None else rating)
+                 + weights.get('play_count', 0.0) * (math.log1p(plays) / play_scale if play_scale else 0.0)
+                 + weights.get('skip_count', 0.0) * (skips / (plays + skips) if plays + skips else 0.0))
+        scores.append(round(score, 4))
+    return scores
@@ -0,0 +1,59 @@
+import collections
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prefetched(items, load, ahead=5):
+    """
+    Iterate over ``items``, yielding ``(item, load(item))`` pairs while
+    the next ``ahead`` items are loaded in a background thread.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pending = collections.deque((item, executor.submit(load, item))
+                                    for item in itertools.islice(items, ahead))
+        while pending:
+            item, future = pending.popleft()
+            for upcoming in itertools.islice(items, 1):
+                pending.append((upcoming, executor.submit(load, upcoming)))
+            yield item, future.result()
+
+
+class WriteBehind(object):
+    """
+    Call ``write`` in a background thread, in submission order, so the
+    caller never waits on the disk. ``close`` waits for the queued writes
+    and returns ``(args, error)`` pairs for all of them, ``error`` being
+    the exception raised by the write or None when it succeeded. Any
+    exception is recorded so the thread keeps handling the next writes.
+    """
+
+    def __init__(self, write):
+        self._write = write
+        self._queue = queue.Queue()
+        self._results = []
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, *args):
+        self._queue.put(args)
+
+    def _run(self):
+        while True:
+            args = self._queue.get()
+            if args is None:
+                return
+            try:
+                self._write(*args)
+            except Exception as exc:
+                self._results.append((args, exc))
+            else:
+                self._results.append((args, None))
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        return self._results
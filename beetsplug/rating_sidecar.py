@@ -0,0 +1,93 @@
+import os
+
+from beets.util import syspath
+
+SIDECAR_NAME = b'.ratings'
+
+
+def read_sidecar(directory):
+    """
+    Return a dict mapping file names to their rating from the sidecar of
+    ``directory``, one ``<rating>\\t<file name>`` entry per line. Lines
+    without a valid rating are skipped.
+    """
+    ratings = {}
+    try:
+        with open(syspath(os.path.join(directory, SIDECAR_NAME)), 'rb') as f:
+            for line in f:
+                rating, _, filename = line.rstrip(b'\n').partition(b'\t')
+                if not filename:
+                    continue
+                try:
+                    ratings[filename] = int(rating)
+                except ValueError:
+                    continue
+    except (IOError, OSError):
+        pass
+    return ratings
+
+
+def write_sidecar(directory, ratings):
+    """
+    Atomically replace the sidecar of ``directory``, removing it if there
+    is no rating left.
+    """
+    path = os.path.join(directory, SIDECAR_NAME)
+    if not ratings:
+        if os.path.exists(syspath(path)):
+            os.remove(syspath(path))
+        return
+    tmp_path = path + b'.tmp'
+    with open(syspath(tmp_path), 'wb') as f:
+        for filename in sorted(ratings):
+            f.write(b'%d\t%s\n' % (ratings[filename], filename))
+    os.replace(syspath(tmp_path), syspath(path))
+
+
+class RatingSidecars(object):
+    """
+    Ratings kept in one ``.ratings`` sidecar file per directory.
+
+    Sidecars are read once per directory, and changes are kept in memory
+    until ``flush`` writes every modified directory once. Setting the
+    rating a sidecar already holds does not modify it.
+    """
+
+    def __init__(self):
+        self._ratings = {}
+        self._pending = {}
+
+    def _directory(self, directory):
+        if directory not in self._ratings:
+            self._ratings[directory] = read_sidecar(directory)
+        return self._ratings[directory]
+
+    def get(self, path):
+        directory, filename = os.path.split(path)
+        return self._directory(directory).get(filename)
+
+    def set(self, path, rating, item_id=None):
+        directory, filename = os.path.split(path)
+        ratings = self._directory(directory)
+        if ratings.get(filename) == rating:
+            # Nothing to write, the sidecar may well be read-only
+            return
+        if rating is None:
+            ratings.pop(filename, None)
+        else:
+            ratings[filename] = rating
+        self._pending.setdefault(directory, set()).add(item_id)
+
+    def flush(self):
+        """
+        Write the modified sidecars. Return the ids of the items whose
+        sidecar could not be written, with the reason.
+        """
+        failed = []
+        for directory, item_ids in self._pending.items():
+            try:
+                write_sidecar(directory, self._ratings[directory])
+            except (IOError, OSError) as exc:
+                failed.extend((item_id, str(exc)) for item_id in item_ids if item_id is not None)
+        self._pending = {}
+        return failed
@@ -1,12 +1,17 @@
 import mediafile
 from mutagen.id3._frames import POPM
+from mutagen.mp4 import MP4FreeForm
 
 from beetsplug.banshee import Mp3BansheeScaler, Mp3MusicBeeScaler
 from beetsplug.mm import Mp3MediaMonkeyScaler
-from beetsplug.scaler import (Mp3BeetsScaler, Mp3QuodlibetScaler,
-                              Mp3WinampScaler)
+from beetsplug.rating_query import rating_index_enabled
+from beetsplug.scaler import (Mp3BeetsScaler, Mp3QuodlibetScaler, Mp3WinampScaler, Mp4FreeformScaler,
+                              Mp4RateScaler, VorbisFmpsScaler, VorbisRatingScaler)
 from beetsplug.wmp import Mp3WindowsMediaPlayerScaler
 
+# Handled by VorbisRatingStorageStyle rather than the generic styles
+VORBIS_FORMATS = ['OggVorbis', 'OggOpus']
+
 
 class MP3UserRatingStorageStyle(mediafile.MP3StorageStyle):
     """
@@ -64,6 +69,8 @@ class AmarokRatingStorageStyle(mediafile.StorageStyle):
 
     TAG = 'FMPS_RATING'
 
+    formats = [f for f in mediafile.StorageStyle.formats if f not in VORBIS_FORMATS]
+
     def __init__(self, **kwargs):
         self._log = kwargs.get('_log')
         self._is_external = kwargs.get('_is_external')
@@ -96,6 +103,8 @@ class UserRatingStorageStyle(mediafile.StorageStyle):
 
     TAG = 'RATING'
 
+    formats = [f for f in mediafile.StorageStyle.formats if f not in VORBIS_FORMATS]
+
     def __init__(self, **kwargs):
         self._log = kwargs.get('_log')
         self._is_external = kwargs.get('_is_external')
@@ -162,16 +171,116 @@ class ASFRatingStorageStyle(mediafile.ASFStorageStyle):
         raise NotImplementedError(u'MP3 Rating storage does not support lists')
 
 
+class MP4RatingStorageStyle(mediafile.MP4StorageStyle):
+    """
+    A codec for ratings in MP4/M4A files, in the ``rate`` atom or the
+    freeform ``RATING`` atom, both 0-100.
+
+    mutagen only walks the atom tree and reads the ``ilst`` metadata, the
+    media data is never read.
+    """
+
+    _KNOWN_EXTERNAL_SCALERS = [Mp4RateScaler(), Mp4FreeformScaler()]
+
+    def __init__(self, **kwargs):
+        self._log = kwargs.get('_log')
+        self._is_external = kwargs.get('_is_external')
+        super(MP4RatingStorageStyle, self).__init__('rate')
+        if self._is_external:
+            self.scalers = MP4RatingStorageStyle._KNOWN_EXTERNAL_SCALERS
+        else:
+            self.scalers = [Mp4RateScaler()]
+
+    def get(self, mutagen_file):
+        tags = mutagen_file.tags or {}
+        for scaler in self.scalers:
+            values = tags.get(scaler.name)
+            if values:
+                value = values[0]
+                try:
+                    if isinstance(value, bytes):
+                        value = value.decode('utf-8')
+                    return scaler.scale(float(value))
+                except ValueError:
+                    continue
+        return None
+
+    def get_list(self, mutagen_file):
+        raise NotImplementedError(u'MP4 Rating storage does not support lists')
+
+    def set(self, mutagen_file, value):
+        if value is not None:
+            tags = mutagen_file.tags or {}
+            for scaler in self.scalers:
+                if scaler.name in tags or not self._is_external:
+                    text = str(scaler.unscale(value))
+                    if scaler.name.startswith('----:'):
+                        mutagen_file[scaler.name] = [MP4FreeForm(text.encode('utf-8'))]
+                    else:
+                        mutagen_file[scaler.name] = [text]
+
+    def set_list(self, mutagen_file, values):
+        raise NotImplementedError(u'MP4 Rating storage does not support lists')
+
+
+class VorbisRatingStorageStyle(mediafile.StorageStyle):
+    """
+    A codec for ratings in Ogg Vorbis and Opus files, in the FMPS_RATING
+    (0-1) or RATING (0-100) comments.
+
+    mutagen only reads the comment header packet, not the audio pages.
+    """
+
+    formats = VORBIS_FORMATS
+
+    _KNOWN_EXTERNAL_SCALERS = [VorbisFmpsScaler(), VorbisRatingScaler()]
+
+    def __init__(self, **kwargs):
+        self._log = kwargs.get('_log')
+        self._is_external = kwargs.get('_is_external')
+        super(VorbisRatingStorageStyle, self).__init__(VorbisFmpsScaler().name)
+        if self._is_external:
+            self.scalers = VorbisRatingStorageStyle._KNOWN_EXTERNAL_SCALERS
+        else:
+            self.scalers = [VorbisFmpsScaler()]
+
+    def get(self, mutagen_file):
+        for scaler in self.scalers:
+            values = mutagen_file.get(scaler.name)
+            if values:
+                try:
+                    return scaler.scale(float(values[0]))
+                except ValueError:
+                    continue
+        return None
+
+    def get_list(self, mutagen_file):
+        raise NotImplementedError(u'Vorbis Rating storage does not support lists')
+
+    def set(self, mutagen_file, value):
+        if value is not None:
+            for scaler in self.scalers:
+                if scaler.name in mutagen_file or not self._is_external:
+                    mutagen_file[scaler.name] = [u'{0:g}'.format(scaler.unscale(value))]
+
+    def set_list(self, mutagen_file, values):
+        raise NotImplementedError(u'Vorbis Rating storage does not support lists')
+
+
 class DefaultValueStorageStyle(mediafile.StorageStyle):
     """
     Range queries don't work if value is None. Temp fix is to set the default
     value as zero.
+    With the ``index`` option, rating queries are answered in SQL where an
+    unrated track simply does not match, so no default value is needed.
     """
 
     def __init__(self, **kwargs):
         super(DefaultValueStorageStyle, self).__init__(u'')
 
     def get(self, mutagen_file):
+        if rating_index_enabled():
+            return None
         return 0
 
     def get_list(self, mutagen_file):
@@ -0,0 +1,138 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+
+from beets.util import bytestring_path, syspath
+
+from .rating_db import item_id_by_path, item_ids_by_path, last_item_id
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct('iIII')
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+class Inotify(object):
+    """
+    A minimal recursive inotify watcher, using libc through ctypes so no
+    extra dependency is needed. Only available on Linux.
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True) if libc_name else None
+        if self._libc is None or not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, u'inotify is not available on this platform')
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), u'inotify_init1 failed')
+        self._directories = {}
+
+    def add_tree(self, root):
+        """
+        Watch ``root`` and all its subdirectories.
+        """
+        for directory, _, _ in os.walk(syspath(root)):
+            directory = bytestring_path(directory)
+            wd = self._libc.inotify_add_watch(self.fd, directory, _WATCH_MASK)
+            if wd >= 0:
+                self._directories[wd] = directory
+
+    def read(self, timeout=None):
+        """
+        Wait up to ``timeout`` seconds for events and return the paths of
+        the files that have been written or moved in. New directories are
+        watched as they appear. An empty path means the kernel queue
+        overflowed and changes may have been lost.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                paths.append(b'')
+            elif mask & IN_IGNORED:
+                self._directories.pop(wd, None)
+            elif wd in self._directories:
+                path = os.path.join(self._directories[wd], name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self.add_tree(path)
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Debouncer(object):
+    """
+    Collect changed paths and release them once they have been quiet for
+    ``delay`` seconds, so a burst of writes to a file is handled once.
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self._changed = {}
+
+    def __len__(self):
+        return len(self._changed)
+
+    def add(self, path, now=None):
+        self._changed[path] = time.time() if now is None else now
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        paths = [path for path, changed in self._changed.items() if now - changed >= self.delay]
+        for path in paths:
+            del self._changed[path]
+        return paths
+
+
+class ItemPaths(object):
+    """
+    Map the changed paths to library item ids. The whole library is read
+    once; a path it does not know is then looked up on its own, and
+    remembered as not being an item until items are added to the library.
+    """
+
+    def __init__(self, lib):
+        self._lib = lib
+        self._item_ids = item_ids_by_path(lib)
+        self._unknown = set()
+        self._last_id = last_item_id(lib)
+
+    def item_ids(self, paths):
+        unknown = [path for path in paths if path not in self._item_ids]
+        if unknown:
+            last_id = last_item_id(self._lib)
+            if last_id != self._last_id:
+                self._unknown.clear()
+                self._last_id = last_id
+        for path in unknown:
+            if path in self._unknown:
+                continue
+            item_id = item_id_by_path(self._lib, path)
+            if item_id is None:
+                self._unknown.add(path)
+            else:
+                self._item_ids[path] = item_id
+        return [self._item_ids[path] for path in paths if path in self._item_ids]
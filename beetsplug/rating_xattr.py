@@ -0,0 +1,42 @@
+import errno
+import os
+
+from beets.util import syspath
+
+XATTR_NAME = 'user.rating'
+
+
+def xattr_supported():
+    return hasattr(os, 'getxattr')
+
+
+def read_xattr_rating(path):
+    """
+    Return the rating stored in the extended attributes of ``path``, or
+    None if there is none.
+    """
+    try:
+        value = os.getxattr(syspath(path), XATTR_NAME)
+    except OSError as exc:
+        if exc.errno in (errno.ENODATA, errno.ENOTSUP, errno.ENOENT):
+            return None
+        raise
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def write_xattr_rating(path, rating):
+    """
+    Store ``rating`` in the extended attributes of ``path``, or remove it
+    if ``rating`` is None.
+    """
+    if rating is None:
+        try:
+            os.removexattr(syspath(path), XATTR_NAME)
+        except OSError as exc:
+            if exc.errno != errno.ENODATA:
+                raise
+    else:
+        os.setxattr(syspath(path), XATTR_NAME, b'%d' % rating)
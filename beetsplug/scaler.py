@@ -49,4 +49,42 @@ class Mp3WinampScaler(Scaler):
 
 class Mp3BeetsScaler(Scaler):
     def __init__(self):
-        super(Mp3BeetsScaler, self).__init__('rating@beets.io')
\ No newline at end of file
+        super(Mp3BeetsScaler, self).__init__('rating@beets.io')
+
+class Mp4RateScaler(Scaler):
+    """
+    the ``rate`` atom of MP4 files, 0-100
+    """
+
+    def __init__(self):
+        super(Mp4RateScaler, self).__init__('rate', max_value=100)
+
+
+class Mp4FreeformScaler(Scaler):
+    """
+    the iTunes-style freeform ``RATING`` atom of MP4 files, 0-100
+    """
+
+    def __init__(self):
+        super(Mp4FreeformScaler, self).__init__('----:com.apple.iTunes:RATING', max_value=100)
+
+
+class VorbisFmpsScaler(Scaler):
+    """
+    the FMPS_RATING Vorbis comment, a decimal number between 0 and 1
+    """
+
+    def __init__(self):
+        super(VorbisFmpsScaler, self).__init__('FMPS_RATING', max_value=1)
+
+    def unscale(self, userrating_value):
+        return userrating_value / float(Scaler.MAX_ACCEPTED_VALUE)
+
+
+class VorbisRatingScaler(Scaler):
+    """
+    the RATING Vorbis comment, 0-100
+    """
+
+    def __init__(self):
+        super(VorbisRatingScaler, self).__init__('RATING', max_value=100)
@@ -12,29 +12,94 @@
 # included in all copies or substantial portions of the Software.
 
 import glob
+import hashlib
+import json
 import os
 import time
 
 import mediafile
-from beets import plugins, ui
+from beets import config, plugins, ui
 from beets.dbcore import types
 from beets.dbcore.types import Integer
-from beets.library import Item
-from beets.util import (bytestring_path, mkdirall, normpath, path_as_posix,
+from beets.library import FileOperationError, Item, parse_query_parts
+from beets.util import (bytestring_path, displayable_path, mkdirall, normpath, path_as_posix,
                         sanitize_path, syspath)
 
-from .rating_styles import (AmarokRatingStorageStyle, ASFRatingStorageStyle, DefaultValueStorageStyle,
-                            MP3UserRatingStorageStyle, UserRatingStorageStyle)
+from .rating_albums import rebuild_album_ratings, update_album_ratings
+from .rating_changelog import ChangeLog
+from .rating_db import item_ids_by_path, item_ratings, list_ratings, rating_stats, store_ratings
+from .rating_duplicates import DUPLICATE_KEYS, WINNER_POLICIES, duplicate_groups
+from .rating_field import FORMAT_TYPES, RatingField
+from .rating_files import read_ratings_file
+from .rating_journal import RatingJournal
+from .rating_progress import SKIPPED, WRITTEN, Progress
+from .rating_query import RatingQuery, UserRatingSort, create_rating_indexes
+from .rating_ranking import (GROUP_COLUMNS, ensure_ranking, rated_paths, remove_from_ranking, top_paths,
+                             update_ranking, update_ranking_ids)
+from .rating_retry import RetryQueue
+from .rating_sampler import RatingSampler
+from .rating_sidecar import RatingSidecars
+from .rating_xattr import read_xattr_rating, write_xattr_rating, xattr_supported
+from .scaler import Scaler
 
 
 class NullInteger(Integer):
     """Same as `Integer`, but does not normalize `None` to `0` but '-1'.
     """
     null = None
+    query = RatingQuery
 
 
 NULL_INTEGER = NullInteger()
 
+# Command line options that define a bulk rating job, saved in the journal
+# so that an interrupted job can be resumed with the same parameters.
+JOB_OPTIONS = ('update', 'imported', 'overwrite', 'sync', 'all')
+
+# Where ratings are written, see the 'storage' option
+STORAGE_CHOICES = ['tags', 'xattr', 'sidecar']
+UNSUPPORTED_STORAGE_CHOICES = ['', 'xattr', 'sidecar']
+
+# Players whose database can be synced, see player_db.PLAYER_DATABASES
+PLAYER_CHOICES = ('banshee', 'clementine')
+
+# How the ratings file can be split in several playlists
+SHARD_CHOICES = ['', 'directory', 'albumartist', 'count']
+
+
+class RelativePathCache(object):
+    """
+    Compute paths relative to ``start``, like ``os.path.relpath``, but only
+    once per distinct parent directory. Libraries have many tracks per
+    directory, so most paths are just a cached prefix and their basename.
+
+    With ``posix`` the relative paths use forward slashes.
+    """
+
+    def __init__(self, start, posix=False):
+        self.start = start
+        self.posix = posix
+        self._prefixes = {}
+
+    def directory(self, path):
+        """
+        Return the directory of ``path`` relative to ``start``, with a
+        trailing separator, or an empty path for ``start`` itself.
+        """
+        head = os.path.dirname(path)
+        prefix = self._prefixes.get(head)
+        if prefix is None:
+            prefix = os.path.relpath(head, self.start)
+            prefix = b'' if prefix == bytestring_path(os.curdir) else prefix + bytestring_path(os.sep)
+            if self.posix:
+                prefix = path_as_posix(prefix)
+            self._prefixes[head] = prefix
+        return prefix
+
+    def __call__(self, path):
+        basename = os.path.basename(path)
+        return self.directory(path) + (path_as_posix(basename) if self.posix else basename)
+
 
 class UserRatingsPlugin(plugins.BeetsPlugin):
     """
@@ -49,6 +114,13 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
         'externalrating': NULL_INTEGER
     }
 
+    album_types = {
+        'userrating_count': types.INTEGER,
+        'userrating_sum': types.INTEGER,
+        'userrating_max': types.INTEGER,
+        'userrating_mean': types.FLOAT,
+    }
+
     def __init__(self):
         super(UserRatingsPlugin, self).__init__()
 
@@ -61,32 +133,85 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
             'sync_ratings': True,
             # SHould we save ratings to a playlist file? (Android Poweramp)
             'ratings_file': "",
-            'forward_slash': False
+            'forward_slash': False,
+            # Split the ratings file by top level 'directory', 'albumartist'
+            # or every 'count' ratings_file_shard_size entries
+            'ratings_file_shard': '',
+            'ratings_file_shard_size': 10000,
+            # Journal of bulk jobs, defaults to userrating.journal in the
+            # beets configuration directory
+            'journal': "",
+            # fsync the journal every n handled items
+            'journal_sync_interval': 100,
+            # Queue of items whose file could not be written, defaults to
+            # userrating.retry in the beets configuration directory
+            'retry_queue': "",
+            # Seconds to wait before the first retry, doubled on each failure
+            'retry_backoff': 60,
+            # Where ratings are written: in the file 'tags', in the 'xattr'
+            # user.rating extended attribute (Linux) or in a per directory
+            # '.ratings' 'sidecar' file
+            'storage': 'tags',
+            # Where the ratings of files in formats without rating tags are
+            # written with the 'tags' storage: 'xattr', 'sidecar' or
+            # nowhere but the library
+            'unsupported_storage': '',
+            # --watch: seconds a file must be left alone before it is read,
+            # and number of tracks stored per transaction
+            'watch_debounce': 2.0,
+            'watch_batch_size': 50,
+            # Log of the rating changes, defaults to userrating.changes in
+            # the beets configuration directory
+            'changelog': "",
+            # Index ratings to answer rating queries and sorts in SQL
+            'index': False,
+            # Maintain a rating ranking table for --playlist
+            'playlist_index': False,
+            # --random: weight of each rating value (default is the rating
+            # itself) and of unrated tracks
+            'random_weights': {},
+            'random_unrated_weight': 0,
+            # --score: attribute the blended score is stored in, and weight
+            # of userrating and the mpdstats rating, play_count, skip_count
+            'score_field': 'score',
+            'score_weights': {},
+            # --propagate: fields identifying copies of the same recording
+            # (mb_trackid, acoustid_id, artist_title_length) and how their
+            # rating is chosen (max, min, mean, most_common)
+            'propagate_keys': ['mb_trackid'],
+            'propagate_winner': 'max',
+            # Keep the rated track count, sum, maximum and mean of the
+            # ratings of each album up to date as album attributes
+            'album_aggregates': False,
+            # Seconds between two progress reports of bulk jobs
+            'progress_interval': 5.0,
         })
 
+        self.item_types = dict(UserRatingsPlugin.item_types)
+        self.item_types[self.config['score_field'].as_str()] = types.FLOAT
+
+        self._retry_queue = None
+        self._sidecars = RatingSidecars()
+        self._changelog = None
+        # Library whose ranking table is known to exist
+        self._ranked_lib = None
+        self._sampler = None
+        self._verbose = False
+        # Item formats whose tags can store ratings, and number of tracks
+        # whose file was skipped for lack of them
+        self._writable_formats = None
+        self._unsupported = 0
+        # Configured storage and unsupported_storage, once validated
+        self._storages = None
+        self.register_listener('database_change', self.invalidate_sampler)
+
         # Add importing ratings to the import process
         if self.config['auto']:
             self.import_stages = [self.imported]
 
-        # Given the complexity of the storage style implementations, I
-        # find it handy to allow them to do unified logging.
-        userrating_field = mediafile.MediaField(
-            AmarokRatingStorageStyle(_log=self._log, _is_external=False),
-            MP3UserRatingStorageStyle(_log=self._log, _is_external=False),
-            UserRatingStorageStyle(_log=self._log, _is_external=False),
-            ASFRatingStorageStyle(_log=self._log, _is_external=False),
-            DefaultValueStorageStyle(_log=self._log, _is_external=True),
-            out_type=int
-        )
-
-        externalrating_field = mediafile.MediaField(
-            AmarokRatingStorageStyle(_log=self._log, _is_external=True),
-            MP3UserRatingStorageStyle(_log=self._log, _is_external=True),
-            UserRatingStorageStyle(_log=self._log, _is_external=True),
-            ASFRatingStorageStyle(_log=self._log, _is_external=True),
-            DefaultValueStorageStyle(_log=self._log, _is_external=True),
-            out_type=int
-        )
+        # Storage styles are only built when a file rating is accessed
+        userrating_field = RatingField(is_external=False, log=self._log)
+        externalrating_field = RatingField(is_external=True, log=self._log)
 
         if 'userrating' not in mediafile.MediaFile.__dict__:
             self.add_media_field('userrating', userrating_field)
@@ -96,6 +221,14 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
         if 'externalrating' not in mediafile.MediaFile.__dict__:
             self.add_media_field('externalrating', externalrating_field)
         
+        Item._sorts['userrating'] = UserRatingSort
+        if self.config['index'].get(bool):
+            self.register_listener('library_opened', create_rating_indexes)
+
+        if self.config['playlist_index'].get(bool):
+            self.register_listener('database_change', self.item_changed)
+            self.register_listener('item_removed', self.item_removed)
+
         if self.config['ratings_file'].get():
             self.register_listener(
                 "database_change", lambda lib, model: self.register_write_listener())
@@ -110,7 +243,7 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
         """
 
         cmd = ui.Subcommand('userrating', help=u'manage user ratings for tracks')
-        cmd.func = lambda lib, opts, args: self.handle_tracks(lib.items(ui.decargs(args)), opts)
+        cmd.func = self.run_command
         cmd.parser.add_option(
             u'-u', u'--update', action='store',
             help=u'all files will be rated with given value',
@@ -131,10 +264,116 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
             u'-a', u'--all', action='store_true',
             help=u'write rating for all known players (default is to not update any players rating but beets)',
         )
+        cmd.parser.add_option(
+            u'--resume', action='store_true',
+            help=u'resume an interrupted -i/-u job where it stopped',
+        )
+        cmd.parser.add_option(
+            u'--retry-failed', action='store_true',
+            help=u'only retry writing the files that previously failed to be written',
+        )
+        cmd.parser.add_option(
+            u'--from-file', action='store', metavar='FILE',
+            help=u'import ratings from a #EXT-X-RATING playlist or a path,rating CSV/TSV file',
+        )
+        cmd.parser.add_option(
+            u'--player', action='store', choices=PLAYER_CHOICES,
+            help=u'import ratings from the database of a player ({0})'.format(u', '.join(PLAYER_CHOICES)),
+        )
+        cmd.parser.add_option(
+            u'--player-db', action='store', metavar='PATH',
+            help=u'location of the player database (default is the player default location)',
+        )
+        cmd.parser.add_option(
+            u'--export', action='store_true',
+            help=u'with --player, write library ratings to the player database instead',
+        )
+        cmd.parser.add_option(
+            u'--from-xattr', action='store_true',
+            help=u'import ratings from the user.rating extended attribute of the files',
+        )
+        cmd.parser.add_option(
+            u'--watch', action='store_true',
+            help=u'keep running and import ratings changed by other players as files are modified',
+        )
+        cmd.parser.add_option(
+            u'--changes-since', action='store', type='float', metavar='TIMESTAMP',
+            help=u'print the rating changes made after TIMESTAMP (0 for all) as JSON lines',
+        )
+        cmd.parser.add_option(
+            u'--changes-after', action='store', type='int', metavar='OFFSET',
+            help=u'print the rating changes logged after the one at OFFSET as JSON lines',
+        )
+        cmd.parser.add_option(
+            u'--playlist', action='store_true',
+            help=u'print the paths of the best rated tracks (see --min, --top and --group)',
+        )
+        cmd.parser.add_option(
+            u'--min', action='store', type='int',
+            help=u'only tracks rated at least MIN (default is 8 for --playlist)',
+        )
+        cmd.parser.add_option(
+            u'--max', action='store', type='int',
+            help=u'only list tracks rated at most MAX',
+        )
+        cmd.parser.add_option(
+            u'--unrated', action='store_true',
+            help=u'only list tracks without a rating',
+        )
+        cmd.parser.add_option(
+            u'--external-only', action='store_true',
+            help=u'only list tracks rated by other players but not imported',
+        )
+        cmd.parser.add_option(
+            u'--top', action='store', type='int',
+            help=u'with --playlist, only the TOP best rated tracks of each group',
+        )
+        cmd.parser.add_option(
+            u'--group', action='store', choices=sorted(GROUP_COLUMNS), default='artist',
+            help=u'with --top, group tracks by artist (default) or album',
+        )
+        cmd.parser.add_option(
+            u'--random', action='store', type='int', metavar='N',
+            help=u'print N random tracks, weighted by their rating',
+        )
+        cmd.parser.add_option(
+            u'--score', action='store_true',
+            help=u'compute the score blending ratings and play statistics of the queried tracks',
+        )
+        cmd.parser.add_option(
+            u'--ask', action='store_true',
+            help=u'rate the queried tracks one at a time',
+        )
+        cmd.parser.add_option(
+            u'--propagate', action='store_true',
+            help=u'copy ratings to unrated copies of the same recording (all copies with -o)',
+        )
+        cmd.parser.add_option(
+            u'--rebuild-album-ratings', action='store_true',
+            help=u'compute the rating aggregates of every album',
+        )
+        cmd.parser.add_option(
+            u'--stats-by', action='store', metavar='FIELD',
+            help=u'print rating coverage and histograms for every value of FIELD',
+        )
+        cmd.parser.add_option(
+            u'--json', action='store_true',
+            help=u'print statistics and listings as JSON lines',
+        )
 
         cmd2 = ui.Subcommand(
             'ratingsfile', help=u'write library ratings to playlist file')
-        cmd2.func = lambda lib, opts, args: self.write_ratings_file(lib)
+        cmd2.func = lambda lib, opts, args: self.profile_run(opts, self.write_ratings_file, lib)
+
+        for subcommand in (cmd, cmd2):
+            subcommand.parser.add_option(
+                u'--profile', action='store', metavar='FILE',
+                help=u'write a cProfile profile of the run to FILE',
+            )
+            subcommand.parser.add_option(
+                u'--memprofile', action='store_true',
+                help=u'log the peak memory and top allocation sites of the run',
+            )
 
         return [cmd, cmd2]
 
@@ -151,30 +390,279 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
         opts.all = False
         opts.sync = False
         self.handle_tracks(task.imported_items(), opts)
+        self.finish_run()
+
+    def _state_path(self, key, default_name):
+        if self.config[key].get():
+            return self.config[key].as_filename()
+        return os.path.join(config.config_dir(), default_name)
+
+    def journal(self):
+        return RatingJournal(self._state_path('journal', 'userrating.journal'),
+                             self.config['journal_sync_interval'].get(int))
+
+    def retry_queue(self):
+        if self._retry_queue is None:
+            self._retry_queue = RetryQueue(self._state_path('retry_queue', 'userrating.retry'),
+                                           self.config['retry_backoff'].get(int))
+        return self._retry_queue
+
+    def changelog(self):
+        if self._changelog is None:
+            self._changelog = ChangeLog(self._state_path('changelog', 'userrating.changes'))
+        return self._changelog
+
+    def finish_run(self):
+        """
+        Persist what has been deferred until the end of a run: modified
+        sidecar files, the retry queue and the change log.
+        """
+        for item_id, reason in self._sidecars.flush():
+            self._log.warning(u'could not write ratings sidecar, item {0} queued for retry: {1}', item_id, reason)
+            self.retry_queue().add(item_id, reason)
+        if self._retry_queue is not None:
+            self._retry_queue.save()
+        if self._changelog is not None:
+            self._changelog.close()
+
+    def run_command(self, lib, opts, args):
+        """
+        Run the "userrating" command.
+        """
+        try:
+            self.profile_run(opts, self._run_command, lib, opts, args)
+        finally:
+            self.finish_run()
+
+    def profile_run(self, opts, func, *args):
+        """
+        Call ``func`` under the profilers requested by ``--profile`` and
+        ``--memprofile``.
+        """
+        if not (opts.profile or opts.memprofile):
+            return func(*args)
+        from .rating_profile import profiled
+        with profiled(self._log, opts.profile, opts.memprofile):
+            return func(*args)
+
+    def _run_command(self, lib, opts, args):
+        """
+        Dispatch the "userrating" command options, journaling bulk jobs so
+        they can be resumed with ``--resume`` after an interruption.
+        """
+        if opts.changes_since is not None:
+            for change in self.changelog().since(opts.changes_since):
+                ui.print_(json.dumps(change))
+            return
+        if opts.changes_after is not None:
+            for change in self.changelog().after(opts.changes_after):
+                ui.print_(json.dumps(change))
+            return
+        if opts.playlist:
+            self.print_playlist(lib, opts)
+            return
+        if opts.random:
+            try:
+                item_ids = self.sampler(lib).sample(opts.random)
+            except ValueError:
+                raise ui.UserError(u'no rated track to draw from')
+            for item_id in item_ids:
+                ui.print_(format(lib.get_item(item_id)))
+            return
+        if opts.score:
+            self.update_scores(lib, ui.decargs(args))
+            return
+        if opts.ask:
+            self.ask_ratings(lib, ui.decargs(args))
+            return
+        if opts.propagate:
+            self.propagate_ratings(lib, opts.overwrite)
+            return
+        if opts.rebuild_album_ratings:
+            self._log.info(u'Computed the ratings of {0} albums', rebuild_album_ratings(lib))
+            return
+        if opts.stats_by:
+            self.print_stats(lib, opts.stats_by, opts.json)
+            return
+        if opts.retry_failed:
+            self.retry_failed(lib)
+            return
+        if opts.from_file:
+            self.import_ratings_file(lib, opts.from_file, opts.overwrite)
+            return
+        if opts.player:
+            self.sync_player(lib, opts.player, opts.player_db, opts.export, opts.overwrite)
+            return
+        if opts.from_xattr:
+            self.import_xattr_ratings(lib, opts.overwrite)
+            return
+        if opts.watch:
+            self.watch(lib)
+            return
+
+        query = ui.decargs(args)
+        if not (opts.update or opts.imported or opts.resume) and (
+                opts.unrated or opts.external_only or opts.json or opts.min is not None or opts.max is not None):
+            self.list_tracks(lib, query, opts)
+            return
+        # Reject an unusable storage before any rating is changed
+        self.storage()
+        journal = None
+        if opts.resume:
+            journal = self.journal()
+            if not journal.exists():
+                raise ui.UserError(u'no interrupted userrating job to resume')
+            params = journal.resume()
+            if params is None:
+                raise ui.UserError(u'the interrupted userrating job cannot be resumed, its journal is truncated: '
+                                   u'run it again')
+            query = params['query']
+            for option in JOB_OPTIONS:
+                setattr(opts, option, params['options'][option])
+            self._log.info(u'resuming job, {0} items already handled', len(journal.completed))
+        elif opts.update or opts.imported:
+            journal = self.journal()
+            journal.start({
+                'query': query,
+                'options': {option: getattr(opts, option) for option in JOB_OPTIONS}
+            })
+
+        try:
+            self.handle_tracks(lib.items(query), opts, journal)
+        finally:
+            if journal is not None:
+                journal.close()
+        if journal is not None:
+            journal.compact()
 
-    def handle_tracks(self, items, opts):
+    def handle_tracks(self, items, opts, journal=None):
         """
         Abstract out our iteration code.
+
+        Bulk jobs report their progress at a fixed interval; the tracks
+        are only logged one by one in verbose mode.
         """
         if len(items) == 0:
             self._log.warning("no item found.")
+        self._verbose = config['verbose'].get(int) > 0
+        self._unsupported = 0
+        progress = None
+        if opts.update or opts.imported:
+            done = len(journal.completed) if journal is not None else 0
+            progress = Progress(self._log, len(items) - done, self.config['progress_interval'].as_number())
         for item in items:
-            self.handle_track(item, opts)
+            if journal is not None:
+                if journal.is_done(item.id):
+                    continue
+                outcome = self.handle_track(item, opts)
+                journal.record(item.id)
+            else:
+                outcome = self.handle_track(item, opts)
+            if progress is not None:
+                progress.update(outcome)
+        if progress is not None and progress.processed:
+            progress.report()
+        if self._unsupported:
+            self._log.info(u'Skipped writing {0} tracks in formats that cannot store ratings', self._unsupported)
 
     def handle_track(self, item, opts):
         """
         Ask for user rating for track and store it in the item.
 
         If user rating information is already present in the item,
-        nothing is done unless ``overwrite`` has been set.
+        nothing is done unless ``overwrite`` has been set. Return whether
+        the rating was ``WRITTEN`` or ``SKIPPED``, or None.
         """
         if opts.update is None and opts.imported is None:
             self.display_track_rating(item)
-        else:
-            if opts.imported:
-                self.import_track_rating(item, opts)
-            if opts.update:
-                self.update_track_rating(item, opts)
+            return None
+        outcome = None
+        if opts.imported:
+            outcome = self.import_track_rating(item, opts)
+        if opts.update:
+            outcome = self.update_track_rating(item, opts)
+        return outcome
+
+    def ask_ratings(self, lib, query):
+        """
+        Prompt for the rating of the tracks matching ``query`` one at a
+        time. The ratings in the files of the next tracks are read in the
+        background while the user decides, and the files are written by a
+        write-behind thread, unless writing is disabled; the library is
+        updated right away.
+        """
+        from .rating_session import WriteBehind, prefetched
+
+        def read_file_rating(item):
+            try:
+                return mediafile.MediaFile(syspath(item.path)).externalrating
+            except mediafile.UnreadableFileError:
+                return None
+
+        # Reject an unusable storage before the writer thread gets to it
+        self.storage()
+        should_write = ui.should_write()
+        writer = WriteBehind(self.write_file)
+        rated = 0
+        try:
+            for item, file_rating in prefetched(lib.items(query), read_file_rating):
+                ui.print_(format(item))
+                ui.print_(u'rating: {0}, in file: {1}'.format(item.get('userrating', u'-'),
+                                                              u'-' if file_rating is None else file_rating))
+                answer = ui.input_options((u'Skip', u'Quit'), numrange=(1, Scaler.MAX_ACCEPTED_VALUE),
+                                          default=u's')
+                if answer == u'q':
+                    break
+                if answer == u's':
+                    continue
+                previous = item.get('userrating')
+                item.userrating = answer
+                item.store()
+                self.record_changes(lib, [(item.id, previous, answer)], 'ask')
+                rated += 1
+                if should_write:
+                    writer.submit(item)
+        finally:
+            for (item,), error in writer.close():
+                self.track_written(item, error)
+        self._log.info(u'Rated {0} tracks', rated)
+
+    def list_tracks(self, lib, query, opts):
+        """
+        List the ratings of the tracks matching ``query`` and the rating
+        filters, evaluated in SQL, as a table or JSON lines. Lines are
+        written in chunks rather than logged one by one.
+        """
+        where, subvals = None, ()
+        item_ids = None
+        if query:
+            parsed, _ = parse_query_parts(query, Item)
+            where, subvals = parsed.clause()
+            if where is None:
+                # Slow query, only matched in Python
+                item_ids = set(item.id for item in lib.items(parsed))
+            else:
+                where = 'items.id IN (SELECT id FROM items WHERE {0})'.format(where)
+        rows = list_ratings(lib, where, subvals, opts.min, opts.max, opts.unrated, opts.external_only)
+
+        lines = []
+        for item_id, path, artist, title, rating, external in rows:
+            if item_ids is not None and item_id not in item_ids:
+                continue
+            if opts.json:
+                lines.append(json.dumps({'id': item_id, 'path': displayable_path(path), 'artist': artist,
+                                         'title': title, 'userrating': rating, 'externalrating': external}))
+            else:
+                lines.append(u'{0:>2} {1:>2} {2} - {3}'.format(
+                    u'-' if rating is None else rating, u'-' if external is None else external, artist, title))
+            if len(lines) == 1000:
+                self._write_lines(lines)
+                lines = []
+        self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        if lines:
+            ui.print_(u'\n'.join(lines))
 
     def display_track_rating(self, item):
         if 'userrating' in item:
@@ -184,38 +672,448 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
 
     def import_track_rating(self, item, opts):
         should_write = ui.should_write()
-        self._log.debug(u'Getting rating for {0}', item)
+        verbose = self._verbose
+        if verbose:
+            self._log.debug(u'Getting rating for {0}', item)
         # Get any rating already in the file
         rating = item.userrating if 'userrating' in item else None
-        self._log.debug(u'Found rating value "{0}"', rating)
         imported_rating = item.externalrating if 'externalrating' in item else None
-        self._log.debug(u'Found external rating value "{0}"', imported_rating)
+        if self.storage(item) == 'sidecar':
+            imported_rating = self._sidecars.get(item.path) or imported_rating
+        if verbose:
+            self._log.debug(u'Found rating value "{0}"', rating)
+            self._log.debug(u'Found external rating value "{0}"', imported_rating)
         if self.valid_rating(imported_rating):
             if not self.valid_rating(rating) or opts.overwrite:
                 item.userrating = int(imported_rating)
-                if should_write and item.try_write():
-                    item.store()
-                    self._log.info(u'Applied rating {0}', imported_rating)
+                if should_write:
+                    written = self.write_track(item)
+                    self.record_changes(item._db, [(item.id, rating, item.userrating)], 'import')
+                    if written:
+                        if verbose:
+                            self._log.info(u'Applied rating {0}', imported_rating)
+                        return WRITTEN
             else:
                 # We should consider asking here
-                self._log.info(u'skip already-rated track {0}', item.path)
+                if verbose:
+                    self._log.info(u'skip already-rated track {0}', item.path)
+                return SKIPPED
+        return None
 
     def update_track_rating(self, item, opts):
         should_write = ui.should_write()
-        self._log.debug(u'Getting rating for {0}', item)
+        verbose = self._verbose
+        if verbose:
+            self._log.debug(u'Getting rating for {0}', item)
         # Get any rating already in the file
         rating = item.userrating if 'userrating' in item else None
-        self._log.debug(u'Found rating value "{0}"', rating)
+        if verbose:
+            self._log.debug(u'Found rating value "{0}"', rating)
         if not self.valid_rating(rating) or opts.overwrite:
             item['userrating'] = int(opts.update)
             if opts.sync or opts.all:
                 item['externalrating'] = int(opts.update)
-            if should_write and item.try_write():
-                item.store()
-                self._log.info(u'Applied rating {0}', opts.update)
+            if should_write:
+                written = self.write_track(item)
+                self.record_changes(item._db, [(item.id, rating, item.userrating)], 'update')
+                if written:
+                    if verbose:
+                        self._log.info(u'Applied rating {0}', opts.update)
+                    return WRITTEN
         else:
             # We should consider asking here
-            self._log.info(u'skip already-rated track {0}', item.path)
+            if verbose:
+                self._log.info(u'skip already-rated track {0}', item.path)
+            return SKIPPED
+        return None
+
+    def storage(self, item=None):
+        """
+        Return where ratings are written: the configured storage or, for
+        the tags of an ``item`` whose format cannot store ratings, the
+        ``unsupported_storage`` fallback, None when its file is skipped.
+        The format is known from the library, no file is opened. Raise a
+        UserError if an ``xattr`` storage is configured on a platform
+        without extended attributes.
+        """
+        if self._storages is None:
+            self._storages = (self.config['storage'].as_choice(STORAGE_CHOICES),
+                              self.config['unsupported_storage'].as_choice(UNSUPPORTED_STORAGE_CHOICES) or None)
+            if 'xattr' in self._storages and not xattr_supported():
+                raise ui.UserError(u'xattr storage: extended attributes are not supported on this platform')
+        storage, unsupported_storage = self._storages
+        if storage != 'tags' or item is None or item.get('format') not in FORMAT_TYPES:
+            return storage
+        if self._writable_formats is None:
+            field = mediafile.MediaFile.__dict__.get('userrating')
+            self._writable_formats = (field.writable_formats() if isinstance(field, RatingField)
+                                      else set(FORMAT_TYPES))
+        if item.format in self._writable_formats:
+            return storage
+        return unsupported_storage
+
+    def write_track(self, item):
+        """
+        Write the rating to the file and store the item.
+
+        With the ``xattr`` or ``sidecar`` storage the file itself is not
+        written, the tags can still be embedded later with ``beet write``.
+        Sidecars are only written by ``finish_run``.
+        If the file cannot be written the rating is still stored in the
+        library and the item is queued for ``--retry-failed``.
+        """
+        if self.storage(item) is None:
+            self._unsupported += 1
+            item.store()
+            if item.id in self.retry_queue():
+                self.retry_queue().remove(item.id)
+            return False
+        try:
+            self.write_file(item)
+        except (FileOperationError, OSError) as exc:
+            return self.track_written(item, exc)
+        return self.track_written(item)
+
+    def write_file(self, item):
+        """
+        Write the rating of ``item`` with the configured storage, without
+        storing the item.
+        """
+        storage = self.storage(item)
+        if storage == 'xattr':
+            write_xattr_rating(item.path, item.get('userrating'))
+        elif storage == 'sidecar':
+            self._sidecars.set(item.path, item.get('userrating'), item.id)
+        elif storage == 'tags':
+            item.write()
+
+    def track_written(self, item, error=None):
+        """
+        Store ``item`` after its file was written, or queue it for retry
+        if writing failed with ``error``.
+        """
+        if error is not None:
+            self._log.warning(u'could not write {0}, queued for retry: {1}', item.path, error)
+            item.store()
+            self.retry_queue().add(item.id, str(error))
+            return False
+        item.store()
+        if item.id in self.retry_queue():
+            self.retry_queue().remove(item.id)
+        return True
+
+    def retry_failed(self, lib):
+        """
+        Write the files of the queued items whose retry delay has expired.
+        """
+        queue = self.retry_queue()
+        due = queue.due()
+        self._log.info(u'{0} of {1} queued items due for retry', len(due), len(queue))
+        for item_id in due:
+            item = lib.get_item(item_id)
+            if item is None:
+                queue.remove(item_id)
+                continue
+            if self.write_track(item):
+                self._log.info(u'Wrote rating to {0}', item.path)
+
+    def import_ratings_file(self, lib, path, overwrite):
+        """
+        Import the ratings of a playlist or CSV file into the library.
+
+        The file is joined against the paths of the whole library loaded
+        in one query, and the ratings are stored in batched transactions.
+        Files are not written, use ``beet write`` to embed the ratings.
+        """
+        item_ids = item_ids_by_path(lib)
+        current = item_ratings(lib)
+        updates = {}
+        skipped = unknown = 0
+        for item_path, rating in read_ratings_file(path, self._log):
+            item_id = item_ids.get(item_path)
+            if item_id is None:
+                unknown += 1
+            elif current.get(item_id) == rating:
+                continue
+            elif self.valid_rating(current.get(item_id)) and not overwrite:
+                skipped += 1
+            else:
+                updates[item_id] = rating
+
+        self.store_changes(lib, updates, current, 'file')
+        self._log.info(u'Imported {0} ratings, skipped {1} already-rated and {2} unknown tracks',
+                       len(updates), skipped, unknown)
+        if updates:
+            plugins.send('database_change', lib=lib, model=None)
+
+    def propagate_ratings(self, lib, overwrite):
+        """
+        Give all the copies of a recording the same rating, chosen among
+        the rated copies by the ``propagate_winner`` policy. Rated copies
+        are only changed with ``overwrite``. Files are not written.
+        """
+        keys = self.config['propagate_keys'].as_str_seq()
+        for key in keys:
+            if key not in DUPLICATE_KEYS:
+                raise ui.UserError(u'unknown propagate key {0}'.format(key))
+        winner = WINNER_POLICIES[self.config['propagate_winner'].as_choice(sorted(WINNER_POLICIES))]
+
+        current = item_ratings(lib)
+        updates = {}
+        groups = duplicate_groups(lib, keys)
+        for group in groups:
+            ratings = [current[item_id] for item_id in group if self.valid_rating(current.get(item_id))]
+            if not ratings:
+                continue
+            rating = winner(ratings)
+            for item_id in group:
+                if current.get(item_id) == rating:
+                    continue
+                if self.valid_rating(current.get(item_id)) and not overwrite:
+                    continue
+                updates[item_id] = rating
+
+        self.store_changes(lib, updates, current, 'propagate')
+        self._log.info(u'Propagated {0} ratings across {1} groups of copies', len(updates), len(groups))
+        if updates:
+            plugins.send('database_change', lib=lib, model=None)
+
+    def sync_player(self, lib, name, db_path, export, overwrite):
+        """
+        Synchronize ratings with the SQLite database of another player,
+        matching tracks on their normalized path. No audio file is touched.
+        """
+        from .player_db import PLAYER_DATABASES
+
+        player = PLAYER_DATABASES[name]
+        db_path = db_path or player.default_path
+        if not db_path or not os.path.exists(db_path):
+            raise ui.UserError(u'{0} database not found, use --player-db'.format(name))
+
+        item_ids = item_ids_by_path(lib)
+        current = item_ratings(lib)
+        if export:
+            updates = []
+            for path, row_id in player.read_all(db_path).items():
+                rating = current.get(item_ids.get(path))
+                if self.valid_rating(rating):
+                    updates.append((row_id, rating))
+            player.write(db_path, updates)
+            self._log.info(u'Exported {0} ratings to {1}', len(updates), db_path)
+            return
+
+        updates = {}
+        skipped = unknown = 0
+        for _, path, rating in player.read(db_path):
+            item_id = item_ids.get(path)
+            if item_id is None:
+                unknown += 1
+            elif current.get(item_id) == rating:
+                continue
+            elif self.valid_rating(current.get(item_id)) and not overwrite:
+                skipped += 1
+            else:
+                updates[item_id] = rating
+
+        self.store_changes(lib, updates, current, name)
+        self._log.info(u'Imported {0} ratings from {1}, skipped {2} already-rated and {3} unknown tracks',
+                       len(updates), name, skipped, unknown)
+        if updates:
+            plugins.send('database_change', lib=lib, model=None)
+
+    def import_xattr_ratings(self, lib, overwrite):
+        """
+        Import the ratings stored in extended attributes, reading only the
+        file metadata and never opening the audio files.
+        """
+        if not xattr_supported():
+            raise ui.UserError(u'extended attributes are not supported on this platform')
+
+        current = item_ratings(lib)
+        updates = {}
+        skipped = 0
+        for path, item_id in item_ids_by_path(lib).items():
+            rating = read_xattr_rating(path)
+            if rating is None or current.get(item_id) == rating:
+                continue
+            elif self.valid_rating(current.get(item_id)) and not overwrite:
+                skipped += 1
+            else:
+                updates[item_id] = rating
+
+        self.store_changes(lib, updates, current, 'xattr')
+        self._log.info(u'Imported {0} ratings from extended attributes, skipped {1} already-rated tracks',
+                       len(updates), skipped)
+        if updates:
+            plugins.send('database_change', lib=lib, model=None)
+
+    def watch(self, lib):
+        """
+        Watch the library directory with inotify and import the ratings of
+        the files modified by other players, until interrupted.
+        """
+        from .rating_watch import Debouncer, Inotify, ItemPaths
+
+        try:
+            inotify = Inotify()
+        except OSError as exc:
+            raise ui.UserError(u'cannot watch the library: {0}'.format(exc))
+        inotify.add_tree(lib.directory)
+        debouncer = Debouncer(self.config['watch_debounce'].as_number())
+        batch_size = self.config['watch_batch_size'].get(int)
+        item_paths = ItemPaths(lib)
+        self._log.info(u'Watching {0} for rating changes', lib.directory)
+        try:
+            while True:
+                for path in inotify.read(debouncer.delay if len(debouncer) else None):
+                    if path:
+                        debouncer.add(path)
+                    else:
+                        self._log.warning(u'too many changes, some were missed: run beet userrating -i -o')
+                changed = item_paths.item_ids(debouncer.due())
+                for start in range(0, len(changed), batch_size):
+                    self.reread_ratings(lib, changed[start:start + batch_size])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            inotify.close()
+
+    def reread_ratings(self, lib, item_ids):
+        """
+        Read only the rating of the files of ``item_ids`` and store the ones
+        that changed as both external and user rating.
+        """
+        current = item_ratings(lib, 'externalrating', item_ids)
+        previous = {}
+        updates = {}
+        for item_id in item_ids:
+            item = lib.get_item(item_id)
+            if item is None:
+                continue
+            try:
+                rating = mediafile.MediaFile(syspath(item.path)).externalrating
+            except mediafile.UnreadableFileError as exc:
+                self._log.debug(u'could not read {0}: {1}', item.path, exc)
+                continue
+            if self.valid_rating(rating) and rating != current.get(item_id):
+                updates[item_id] = rating
+                previous[item_id] = item.get('userrating')
+        if updates:
+            store_ratings(lib, updates.items(), 'externalrating')
+            self.store_changes(lib, updates, previous, 'watch')
+            self._log.info(u'Updated {0} ratings changed by other players', len(updates))
+            plugins.send('database_change', lib=lib, model=None)
+
+    def store_changes(self, lib, updates, current, source):
+        """
+        Store the ``updates`` item id -> rating dict in bulk and log the
+        changes from the ``current`` ratings.
+        """
+        store_ratings(lib, updates.items())
+        if self.config['playlist_index'].get(bool):
+            self.ranking(lib)
+            update_ranking_ids(lib, updates.keys())
+        self.record_changes(lib, [(item_id, current.get(item_id), rating) for item_id, rating in updates.items()],
+                            source)
+
+    def record_changes(self, lib, changes, source):
+        """
+        Log the stored ``(item_id, old, new)`` rating changes made by
+        ``source`` and update the album aggregates.
+        """
+        changelog = self.changelog()
+        for item_id, old, new in changes:
+            changelog.record(item_id, old, new, source)
+        if self.config['album_aggregates'].get(bool):
+            update_album_ratings(lib, [change for change in changes if change[1] != change[2]])
+
+    def ranking(self, lib):
+        if self._ranked_lib is not lib:
+            ensure_ranking(lib)
+            self._ranked_lib = lib
+
+    def update_scores(self, lib, query):
+        """
+        Compute the blended score of the tracks matching ``query`` (the whole
+        library if empty) in one pass, and store the ones that changed.
+        """
+        # NumPy is slow to import
+        from .rating_score import DEFAULT_WEIGHTS, blend_scores, load_features
+
+        field = self.config['score_field'].as_str()
+        weights = dict(DEFAULT_WEIGHTS)
+        weights.update({feature: float(weight)
+                        for feature, weight in self.config['score_weights'].get(dict).items()})
+        item_ids = [item.id for item in lib.items(query)] if query else None
+        item_ids, columns, max_play_count = load_features(lib, item_ids)
+        scores = blend_scores(columns, max_play_count, weights)
+
+        current = item_ratings(lib, field, item_ids if query else None, float)
+        updates = [(item_id, score) for item_id, score in zip(item_ids, scores) if current.get(item_id) != score]
+        store_ratings(lib, updates, field)
+        self._log.info(u'Updated {0} of {1} scores', len(updates), len(item_ids))
+
+    def print_stats(self, lib, field, as_json=False):
+        """
+        Print the rating statistics of every value of the ``field`` item
+        column, aggregated by the database.
+        """
+        if field not in Item._fields or field == 'path':
+            raise ui.UserError(u'cannot group statistics by {0}'.format(field))
+        for stats in rating_stats(lib, field):
+            if as_json:
+                ui.print_(json.dumps(stats))
+                continue
+            ui.print_(u'{0}: {1} of {2} rated, {3} by other players only{4}{5}'.format(
+                stats[field] if stats[field] not in (None, u'') else u'<none>',
+                stats['rated'], stats['tracks'], stats['external_only'],
+                u', mean {0:.1f}'.format(stats['mean']) if stats['mean'] is not None else u'',
+                u', histogram ' + u' '.join(u'{0}:{1}'.format(rating, count)
+                                            for rating, count in sorted(stats['histogram'].items()))
+                if stats['histogram'] else u''))
+
+    def sampler(self, lib):
+        """
+        Return the rating-weighted random sampler of ``lib``.
+        """
+        if self._sampler is None or self._sampler.lib is not lib:
+            weights = {rating: rating for rating in range(1, Scaler.MAX_ACCEPTED_VALUE + 1)}
+            weights.update({int(rating): float(weight)
+                            for rating, weight in self.config['random_weights'].get(dict).items()})
+            self._sampler = RatingSampler(lib, weights, self.config['random_unrated_weight'].as_number())
+        return self._sampler
+
+    def invalidate_sampler(self, lib, model):
+        if self._sampler is not None:
+            self._sampler.invalidate()
+
+    def item_changed(self, lib, model):
+        if isinstance(model, Item) and model.id is not None:
+            self.ranking(lib)
+            update_ranking(lib, model)
+
+    def item_removed(self, item):
+        self.ranking(item._db)
+        remove_from_ranking(item._db, item.id)
+
+    def print_playlist(self, lib, opts):
+        """
+        Print the best rated tracks from the ranking table, which is
+        indexed so that the time taken only depends on the output size.
+        Without the ``playlist_index`` option the table is not maintained
+        and has to be rebuilt first.
+        """
+        if self.config['playlist_index'].get(bool):
+            self.ranking(lib)
+        else:
+            ensure_ranking(lib, rebuild=True)
+        min_rating = 8 if opts.min is None else opts.min
+        if opts.top:
+            paths = top_paths(lib, opts.top, opts.group, min_rating)
+        else:
+            paths = rated_paths(lib, min_rating)
+        for path in paths:
+            ui.print_(displayable_path(path))
 
     def register_write_listener(self):
         self.register_listener("cli_exit", self.write_ratings_file)
@@ -234,15 +1132,12 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
         if not os.path.exists(rating_dir):
             os.makedirs(rating_dir)
 
-        # If the file has %s use a timestamp
-        if "%s" in str(rating_file):
-            old_files = glob.glob(rating_file % b"*")
-            if len(old_files):
-                # Remove up to one file to avoid surprises
-                os.remove(old_files[0])
-            rating_file = rating_file % bytearray(str(int(time.time())), "utf-8")
-
+        shard_by = self.config['ratings_file_shard'].as_choice(SHARD_CHOICES)
+        if shard_by and "%s" in str(rating_file):
+            raise ui.UserError(u'a ratings_file with %s cannot be sharded')
 
+        relative_path = RelativePathCache(rating_dir, self.config['forward_slash'].get())
+        library_path = RelativePathCache(lib.directory) if shard_by == 'directory' else None
         ratings = {}
         for item in lib.items(""):
             # Grab rating
@@ -254,15 +1149,120 @@ class UserRatingsPlugin(plugins.BeetsPlugin):
             
             # Add to dict
             if userrating is not None:
-                item_path = os.path.relpath(item.path, rating_dir)
-                ratings[item_path] = userrating
-
-        # Write ratings to rating file
-        with open(rating_file, 'wb') as f:
-            for fn, rating in ratings.items():
-                if self.config['forward_slash'].get():
-                    fn = path_as_posix(fn)
-                f.write(b"#EXT-X-RATING:" + bytes("%d" % (rating // 2), 'utf-8') 
-                    + b"\n" + fn + b"\n")
-
-        self._log.info(u"Wrote ratings to {0}", rating_file)
+                item_path = relative_path(item.path)
+                ratings[item_path] = (userrating, self._shard_key(library_path, item, shard_by, len(ratings)))
+
+        if not shard_by:
+            hashes = self._ratings_file_hashes()
+            key = self.config["ratings_file"].get()
+            published = glob.glob(rating_file % b"*") if "%s" in str(rating_file) \
+                else [rating_file] if os.path.exists(rating_file) else []
+            # Hashed while it is written, published only if it changed
+            tmp_file = (rating_file % b"" if "%s" in str(rating_file) else rating_file) + b".tmp"
+            digest = self._write_ratings_playlist(tmp_file, ratings.items())
+            if published and hashes.get(key) == digest:
+                os.remove(tmp_file)
+                self._log.info(u"Ratings unchanged, skipped writing {0}", published[0])
+                return
+
+            # If the file has %s use a timestamp
+            if "%s" in str(rating_file):
+                if len(published):
+                    # Remove up to one file to avoid surprises
+                    os.remove(published[0])
+                rating_file = rating_file % bytearray(str(int(time.time())), "utf-8")
+
+            os.replace(tmp_file, rating_file)
+            hashes[key] = digest
+            self._save_ratings_file_hashes(hashes)
+            self._log.info(u"Wrote ratings to {0}", rating_file)
+            return
+
+        shards = {}
+        for fn, (rating, key) in ratings.items():
+            shards.setdefault(key, []).append((fn, (rating, key)))
+        base, ext = os.path.splitext(rating_file)
+        shard_files = {base + b'.' + key + ext: entries for key, entries in shards.items()}
+
+        # Drop the shards published by the last run that no longer have
+        # any rated item, leaving other files alone
+        hashes = self._ratings_file_hashes()
+        key = u'shards:' + self.config["ratings_file"].as_str()
+        for old_file in map(os.fsencode, hashes.get(key, [])):
+            if old_file not in shard_files and os.path.exists(old_file):
+                os.remove(old_file)
+        hashes[key] = sorted(map(os.fsdecode, shard_files))
+        self._save_ratings_file_hashes(hashes)
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor() as executor:
+            written = sum(executor.map(lambda args: self._write_shard(*args), shard_files.items()))
+        self._log.info(u"Wrote {0} of {1} ratings file shards to {2}", written, len(shard_files), rating_dir)
+
+    def _shard_key(self, library_path, item, shard_by, index):
+        """
+        Return the name of the ratings file shard ``item`` belongs to.
+        """
+        if shard_by == 'directory':
+            directory = library_path.directory(item.path)
+            if not directory or directory.startswith(bytestring_path(os.pardir)):
+                return b'_'
+            key = directory.split(bytestring_path(os.sep))[0]
+        elif shard_by == 'albumartist':
+            key = bytestring_path(item.albumartist or item.artist or u'_')
+        elif shard_by == 'count':
+            key = b'%04d' % (index // self.config['ratings_file_shard_size'].get(int))
+        else:
+            return None
+        # A single path component
+        key = key.decode('utf-8', 'replace')
+        for separator in filter(None, (os.sep, os.altsep)):
+            key = key.replace(separator, u'_')
+        return bytestring_path(sanitize_path(key)).replace(b'.', b'_')
+
+    @staticmethod
+    def _write_ratings_playlist(path, ratings):
+        """
+        Write a ratings playlist for (relative path, (rating, _)) entries to
+        ``path`` line by line, and return the SHA-1 hex digest of its content.
+        """
+        digest = hashlib.sha1()
+        with open(path, 'wb') as f:
+            for fn, (rating, _) in ratings:
+                line = b"#EXT-X-RATING:" + bytes("%d" % (rating // 2), 'utf-8') + b"\n" + fn + b"\n"
+                digest.update(line)
+                f.write(line)
+        return digest.hexdigest()
+
+    def _ratings_file_hashes(self):
+        """
+        Return the hashes of the last published ratings files, by
+        ``ratings_file`` setting.
+        """
+        path = os.path.join(config.config_dir(), 'userrating.ratings_hash')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_ratings_file_hashes(self, hashes):
+        with open(os.path.join(config.config_dir(), 'userrating.ratings_hash'), 'w') as f:
+            json.dump(hashes, f)
+
+    def _write_shard(self, path, entries):
+        """
+        Write a shard unless its content did not change. Return whether it
+        has been written.
+        """
+        tmp_path = path + b'.tmp'
+        digest = self._write_ratings_playlist(tmp_path, entries)
+        if os.path.exists(path):
+            published = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(64 * 1024), b''):
+                    published.update(block)
+            if published.hexdigest() == digest:
+                os.remove(tmp_path)
+                return False
+        os.replace(tmp_path, path)
+        return True
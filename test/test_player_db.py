@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import unittest
+
+from beetsplug.player_db import PLAYER_DATABASES
+from beetsplug.userrating import PLAYER_CHOICES
+from test.helper import TestHelper
+
+
+class PlayerChoicesTest(unittest.TestCase):
+
+    def test_choices_match_databases(self):
+        self.assertEqual(sorted(PLAYER_DATABASES), list(PLAYER_CHOICES))
+
+
+class BansheeDatabaseSyncTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.items = [self.add_item(path=os.path.join(self.libdir, b'a', b'%d t.mp3' % i)) for i in range(3)]
+        self.items[2].userrating = 4
+        self.items[2].store()
+
+        self.db_path = os.path.join(self.temp_dir, b'banshee.db').decode()
+        connection = sqlite3.connect(self.db_path)
+        with connection:
+            connection.execute('CREATE TABLE CoreTracks (TrackID INTEGER PRIMARY KEY, Uri TEXT, Rating INTEGER)')
+            connection.executemany('INSERT INTO CoreTracks VALUES (?, ?, ?)', [
+                (1, 'file://' + self.items[0].path.decode().replace(' ', '%20'), 5),
+                (2, 'file://' + self.items[1].path.decode().replace(' ', '%20'), 0),
+                (3, 'file://' + self.items[2].path.decode().replace(' ', '%20'), 1),
+                (4, 'file:///elsewhere/x.mp3', 3),
+            ])
+        connection.close()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_import_from_banshee(self):
+        self.run_command('userrating', '--player', 'banshee', '--player-db', self.db_path)
+        self.assertEqual([10, None, 4], [self.lib.get_item(item.id).get('userrating') for item in self.items])
+
+    def test_export_to_banshee(self):
+        self.run_command('userrating', '--player', 'banshee', '--player-db', self.db_path, '--export')
+        connection = sqlite3.connect(self.db_path)
+        ratings = dict(connection.execute('SELECT TrackID, Rating FROM CoreTracks'))
+        connection.close()
+        self.assertEqual({1: 5, 2: 0, 3: 2, 4: 3}, ratings)
+
+
+class ClementineDatabaseSyncTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.items = [self.add_item(path=os.path.join(self.libdir, b'a', b'%d t.mp3' % i)) for i in range(4)]
+        self.items[2].userrating = 4
+        self.items[2].store()
+        self.items[3].userrating = 10
+        self.items[3].store()
+
+        # Clementine stores file:// URLs and REAL ratings between 0-1, -1
+        # for unrated tracks, in its songs table
+        self.db_path = os.path.join(self.temp_dir, b'clementine.db').decode()
+        connection = sqlite3.connect(self.db_path)
+        with connection:
+            connection.execute('CREATE TABLE songs (title TEXT, filename TEXT NOT NULL, '
+                               'rating REAL NOT NULL DEFAULT -1)')
+            connection.executemany('INSERT INTO songs (title, filename, rating) VALUES (?, ?, ?)', [
+                ('0', 'file://' + self.items[0].path.decode().replace(' ', '%20'), 0.8),
+                ('1', 'file://' + self.items[1].path.decode().replace(' ', '%20'), -1),
+                ('2', 'file://' + self.items[2].path.decode().replace(' ', '%20'), 0.3),
+                ('3', 'file://' + self.items[3].path.decode().replace(' ', '%20'), -1),
+                ('x', 'file:///elsewhere/x.mp3', 0.5),
+            ])
+        connection.close()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _player_ratings(self):
+        connection = sqlite3.connect(self.db_path)
+        ratings = dict(connection.execute('SELECT title, rating FROM songs'))
+        connection.close()
+        return ratings
+
+    def test_import_from_clementine(self):
+        self.run_command('userrating', '--player', 'clementine', '--player-db', self.db_path)
+        self.assertEqual([8, None, 4, 10], [self.lib.get_item(item.id).get('userrating') for item in self.items])
+
+    def test_import_from_clementine_with_overwrite(self):
+        self.run_command('userrating', '--player', 'clementine', '--player-db', self.db_path, '-o')
+        self.assertEqual([8, None, 3, 10], [self.lib.get_item(item.id).get('userrating') for item in self.items])
+
+    def test_export_to_clementine(self):
+        self.run_command('userrating', '--player', 'clementine', '--player-db', self.db_path, '--export')
+        self.assertEqual({'0': 0.8, '1': -1, '2': 0.4, '3': 1.0, 'x': 0.5}, self._player_ratings())
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from mediafile import MediaFile
+
+from beetsplug.rating_field import RatingField
+from test.helper import TestHelper
+
+# Modules the plugin must not import until they are needed
+LAZY_MODULES = ('numpy', 'beetsplug.rating_styles', 'beetsplug.rating_score', 'beetsplug.rating_watch',
+                'beetsplug.rating_session', 'beetsplug.player_db')
+
+
+class LazyStartupTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_heavy_modules_not_imported(self):
+        code = ('import sys\n'
+                'from beetsplug.userrating import UserRatingsPlugin\n'
+                'UserRatingsPlugin()\n'
+                'print(" ".join(name for name in {0!r} if name in sys.modules))').format(LAZY_MODULES)
+        env = dict(os.environ, BEETSDIR=self.temp_dir)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root, env=env)
+        self.assertEqual(b'', output.strip())
+
+    def test_styles_built_on_first_access(self):
+        item = self.add_item_fixtures('mp3')[0]
+        item.read()
+        field = MediaFile.__dict__['userrating']
+        self.assertIsInstance(field, RatingField)
+        self.assertEqual(7, len(field._styles))
+
+
+if __name__ == '__main__':
+    unittest.main()
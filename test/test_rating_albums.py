@@ -0,0 +1,56 @@
+import unittest
+
+from beets import config
+
+from beetsplug.rating_albums import rebuild_album_ratings
+from test.helper import TestHelper
+
+
+class AlbumRatingsTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        config['userrating']['album_aggregates'] = True
+        self.load_plugins('userrating')
+        self.album = self.add_album_fixture(track_count=3, ext='mp3')
+        self.items = sorted(self.album.items(), key=lambda item: item.id)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _aggregates(self):
+        album = self.lib.get_album(self.album.id)
+        return [album.get(key) for key in ('userrating_count', 'userrating_sum', 'userrating_max',
+                                           'userrating_mean')]
+
+    def _rate(self, item, rating):
+        self.run_command('userrating', '-u', str(rating), '-o', 'id:{0}'.format(item.id))
+
+    def test_incremental(self):
+        self._rate(self.items[0], 8)
+        self.assertEqual([1, 8, 8, 8.0], self._aggregates())
+        self._rate(self.items[1], 5)
+        self.assertEqual([2, 13, 8, 6.5], self._aggregates())
+        self._rate(self.items[1], 10)
+        self.assertEqual([2, 18, 10, 9.0], self._aggregates())
+        # The best rated track is rated lower
+        self._rate(self.items[1], 2)
+        self.assertEqual([2, 10, 8, 5.0], self._aggregates())
+
+    def test_rebuild(self):
+        for item, rating in zip(self.items, (4, 6, 0)):
+            item.userrating = rating
+            item.store()
+        self.assertEqual([None, None, None, None], self._aggregates())
+        self.assertEqual(1, rebuild_album_ratings(self.lib))
+        self.assertEqual([2, 10, 6, 5.0], self._aggregates())
+
+    def test_query(self):
+        self._rate(self.items[0], 8)
+        self.assertEqual([self.album.id], [album.id for album in self.lib.albums('userrating_mean:7..')])
+        self.assertEqual([], list(self.lib.albums('userrating_mean:9..')))
+
+
+if __name__ == '__main__':
+    unittest.main()
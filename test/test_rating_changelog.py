@@ -0,0 +1,58 @@
+import json
+import os
+import unittest
+
+from beetsplug.rating_changelog import ChangeLog
+from test.helper import TestHelper
+
+
+class ChangeLogTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.item = self.add_item_fixtures(ext='mp3')[0]
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _changes(self, since, option='--changes-since'):
+        output = self.run_with_output('userrating', option, str(since))
+        return [json.loads(line) for line in output.splitlines()]
+
+    def test_changes_since(self):
+        self.run_command('userrating', '-u', '6')
+        self.run_command('userrating', '-u', '6', '-o')
+        changes = self._changes(0)
+        self.assertEqual([(self.item.id, None, 6, 'update')],
+                         [(c['id'], c['old'], c['new'], c['source']) for c in changes])
+
+        self.touch(b'ratings.csv', content=u'{0},8\n'.format(self.item.path.decode()))
+        self.run_command('userrating', '-o', '--from-file', os.path.join(self.temp_dir, b'ratings.csv'))
+        changes = self._changes(changes[-1]['time'])
+        self.assertEqual([(self.item.id, 6, 8, 'file')],
+                         [(c['id'], c['old'], c['new'], c['source']) for c in changes])
+
+    def test_changes_after(self):
+        self.run_command('userrating', '-u', '6')
+        offset = self._changes(0)[-1]['offset']
+        self.assertEqual([], self._changes(offset, '--changes-after'))
+
+        self.run_command('userrating', '-u', '7', '-o')
+        changes = self._changes(offset, '--changes-after')
+        self.assertEqual([(self.item.id, 6, 7, 'update')],
+                         [(c['id'], c['old'], c['new'], c['source']) for c in changes])
+
+    def test_concurrent_logs_written_in_order(self):
+        path = os.path.join(self.temp_dir, b'changes')
+        first, second = ChangeLog(path), ChangeLog(path)
+        first.record(1, None, 2, 'import')
+        second.record(2, None, 4, 'watch')
+        first.record(3, None, 6, 'import')
+        changes = list(ChangeLog(path).since(0))
+        first.close()
+        second.close()
+        self.assertEqual([1, 2, 3], [c['id'] for c in changes])
+        self.assertEqual(sorted(c['time'] for c in changes), [c['time'] for c in changes])
+        self.assertEqual([3], [c['id'] for c in ChangeLog(path).after(changes[1]['offset'])])
@@ -0,0 +1,77 @@
+import unittest
+
+from beets import config
+
+from beetsplug.rating_duplicates import duplicate_groups
+from test.helper import TestHelper
+
+
+class PropagateTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _add(self, userrating=None, **values):
+        values.setdefault('mb_trackid', u'')
+        values.setdefault('acoustid_id', u'')
+        item = self.add_item(**values)
+        if userrating is not None:
+            item.userrating = userrating
+            item.store()
+        return item
+
+    def _ratings(self, items):
+        return [self.lib.get_item(item.id).get('userrating') for item in items]
+
+    def test_groups(self):
+        a = self._add(mb_trackid=u'1')
+        b = self._add(mb_trackid=u'1', acoustid_id=u'x')
+        c = self._add(acoustid_id=u'x')
+        d = self._add(mb_trackid=u'2')
+        e = self._add(acoustid_id=u'x')
+        self.assertEqual([[a.id, b.id]], duplicate_groups(self.lib, ['mb_trackid']))
+        self.assertEqual([[a.id, b.id], [c.id, e.id]], duplicate_groups(self.lib, ['mb_trackid', 'acoustid_id']))
+        self.assertNotIn(d.id, sum(duplicate_groups(self.lib, ['mb_trackid', 'acoustid_id']), []))
+
+    def test_fallback_key_keeps_distinct_recordings_apart(self):
+        a = self._add(mb_trackid=u'1', artist=u'A', title=u'Song', length=200.0)
+        b = self._add(mb_trackid=u'2', artist=u'A', title=u'Song', length=200.0)
+        c = self._add(artist=u'A', title=u'Song', length=200.0)
+        d = self._add(artist=u'a', title=u'song', length=200.0)
+        self.assertEqual([[c.id, d.id]], duplicate_groups(self.lib, ['mb_trackid', 'artist_title_length']))
+        items = [self._add(8, mb_trackid=u'3', artist=u'B', title=u'Live', length=300.0),
+                 self._add(2, mb_trackid=u'4', artist=u'B', title=u'Live', length=300.0)]
+        config['userrating']['propagate_keys'] = ['mb_trackid', 'artist_title_length']
+        self.run_command('userrating', '--propagate', '-o')
+        self.assertEqual([8, 2], self._ratings(items))
+        self.assertNotIn(a.id, sum(duplicate_groups(self.lib, ['mb_trackid', 'artist_title_length']), []))
+        self.assertNotIn(b.id, sum(duplicate_groups(self.lib, ['mb_trackid', 'artist_title_length']), []))
+
+    def test_artist_title_length(self):
+        a = self._add(artist=u'A', title=u'Song', length=200.2)
+        b = self._add(artist=u'a', title=u'song', length=199.9)
+        self._add(artist=u'a', title=u'song', length=150.0)
+        self.assertEqual([[a.id, b.id]], duplicate_groups(self.lib, ['artist_title_length']))
+
+    def test_propagate(self):
+        items = [self._add(8, mb_trackid=u'1'), self._add(mb_trackid=u'1'), self._add(4, mb_trackid=u'1'),
+                 self._add(mb_trackid=u'2')]
+        self.run_command('userrating', '--propagate')
+        self.assertEqual([8, 8, 4, None], self._ratings(items))
+        self.run_command('userrating', '--propagate', '-o')
+        self.assertEqual([8, 8, 8, None], self._ratings(items))
+
+    def test_winner_policy(self):
+        config['userrating']['propagate_winner'] = 'min'
+        items = [self._add(8, mb_trackid=u'1'), self._add(4, mb_trackid=u'1')]
+        self.run_command('userrating', '--propagate', '-o')
+        self.assertEqual([4, 4], self._ratings(items))
+
+
+if __name__ == '__main__':
+    unittest.main()
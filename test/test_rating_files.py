@@ -0,0 +1,56 @@
+import os
+import unittest
+
+from test.helper import TestHelper, capture_log
+
+
+class RatingsFileImportTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.items = [self.add_item(path=os.path.join(self.libdir, b'a', b'%d.mp3' % i)) for i in range(3)]
+        self.items[2].userrating = 4
+        self.items[2].store()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _ratings(self):
+        return [self.lib.get_item(item.id).get('userrating') for item in self.items]
+
+    def test_import_playlist(self):
+        self.touch(b'ratings.m3u8', content=u'#EXTM3U\n'
+                                            u'#EXT-X-RATING:5\nlibdir/a/0.mp3\n'
+                                            u'libdir/a/1.mp3\n'
+                                            u'#EXT-X-RATING:1\nlibdir/a/2.mp3\n'
+                                            u'#EXT-X-RATING:3\nlibdir/missing.mp3\n')
+        self.run_command('userrating', '--from-file', os.path.join(self.temp_dir, b'ratings.m3u8'))
+        self.assertEqual([10, None, 4], self._ratings())
+
+    def test_import_csv_with_overwrite(self):
+        self.touch(b'ratings.csv', content=u'path,rating\n'
+                                           u'libdir/a/1.mp3,7\n'
+                                           u'{0},2\n'.format(self.items[2].path.decode()))
+        self.run_command('userrating', '-o', '--from-file', os.path.join(self.temp_dir, b'ratings.csv'))
+        self.assertEqual([None, 7, 2], self._ratings())
+
+    def test_invalid_playlist_ratings_are_skipped(self):
+        self.touch(b'ratings.m3u8', content=u'#EXT-X-RATING:\nlibdir/a/0.mp3\n'
+                                            u'#EXT-X-RATING:x\nlibdir/a/1.mp3\n'
+                                            u'#EXT-X-RATING:9\nlibdir/a/1.mp3\n')
+        with capture_log() as logs:
+            self.run_command('userrating', '--from-file', os.path.join(self.temp_dir, b'ratings.m3u8'))
+        self.assertEqual([None, None, 4], self._ratings())
+        self.assertEqual(3, len([line for line in logs if 'skipping invalid rating' in line]))
+
+    def test_out_of_range_csv_ratings_are_skipped(self):
+        self.touch(b'ratings.csv', content=u'path,rating\n'
+                                           u'libdir/a/0.mp3,255\n'
+                                           u'libdir/a/1.mp3,-1\n'
+                                           u'libdir/a/2.mp3,x\n')
+        with capture_log() as logs:
+            self.run_command('userrating', '-o', '--from-file', os.path.join(self.temp_dir, b'ratings.csv'))
+        self.assertEqual([None, None, 4], self._ratings())
+        self.assertEqual(3, len([line for line in logs if 'skipping invalid rating' in line]))
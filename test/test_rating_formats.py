@@ -0,0 +1,51 @@
+import logging
+import unittest
+
+import beets.plugins
+from beets import config
+
+from beetsplug.rating_field import RatingField
+from test.helper import TestHelper, capture_log
+
+
+class WritableFormatsTest(unittest.TestCase):
+
+    def test_formats_from_styles(self):
+        formats = RatingField(is_external=False, log=logging.getLogger()).writable_formats()
+        self.assertIn('MP3', formats)
+        self.assertIn('FLAC', formats)
+        self.assertIn('Windows Media', formats)
+        self.assertIn('AAC', formats)
+        self.assertIn('Opus', formats)
+
+
+class UnsupportedFormatTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        # Every known format has a rating storage style, pretend AAC has none
+        self.plugin = beets.plugins.find_plugins()[0]
+        self.plugin._writable_formats = {'MP3'}
+        # No file behind it: writing it would fail and queue a retry
+        self.item = self.add_item(format=u'AAC', path=b'/nonexistent/track.m4a')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_skipped(self):
+        with capture_log() as logs:
+            self.run_command('userrating', '-u', '6')
+        self.assertEqual(6, self.lib.get_item(self.item.id).userrating)
+        self.assertTrue(any('Skipped writing 1 tracks' in line for line in logs))
+        self.assertFalse(any('queued for retry' in line for line in logs))
+
+    def test_routed_to_sidecar(self):
+        config['userrating']['unsupported_storage'] = 'sidecar'
+        self.assertEqual('sidecar', self.plugin.storage(self.item))
+        self.assertEqual('tags', self.plugin.storage(self.add_item(format=u'MP3')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from beets import config, ui
+
+from beetsplug.rating_journal import RatingJournal
+from test.helper import TestHelper
+
+
+class RatingJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'userrating.journal')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_resume_interrupted_job(self):
+        params = {'query': ['artist:foo'], 'options': {'update': '8'}}
+        journal = RatingJournal(self.path, sync_interval=2)
+        journal.start(params)
+        journal.record(3)
+        journal.record(1)
+        journal.close()
+
+        journal = RatingJournal(self.path)
+        self.assertEqual(params, journal.resume())
+        self.assertTrue(journal.is_done(1))
+        self.assertTrue(journal.is_done(3))
+        self.assertFalse(journal.is_done(2))
+        journal.record(2)
+        journal.close()
+
+        self.assertEqual({1, 2, 3}, self._completed())
+
+    def _completed(self):
+        journal = RatingJournal(self.path)
+        journal.load()
+        return journal.completed
+
+    def test_truncated_entry_is_ignored(self):
+        journal = RatingJournal(self.path)
+        journal.start({'query': [], 'options': {}})
+        journal.record(1)
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('4')
+        self.assertEqual({1}, self._completed())
+
+    def test_resume_after_truncated_entry(self):
+        journal = RatingJournal(self.path)
+        journal.start({'query': [], 'options': {}})
+        journal.record(1)
+        journal.close()
+        with open(self.path, 'a') as f:
+            f.write('4')
+        journal = RatingJournal(self.path)
+        journal.resume()
+        journal.record(7)
+        journal.close()
+        self.assertEqual({1, 7}, self._completed())
+
+    def test_truncated_header_is_not_resumed(self):
+        with open(self.path, 'w') as f:
+            f.write('{"query"')
+        self.assertIsNone(RatingJournal(self.path).resume())
+
+    def test_compact_on_completion(self):
+        journal = RatingJournal(self.path)
+        journal.start({'query': [], 'options': {}})
+        journal.record(1)
+        journal.compact()
+        self.assertFalse(os.path.exists(self.path))
+
+
+class ResumeCommandTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_truncated_header(self):
+        with open(os.path.join(config.config_dir(), 'userrating.journal'), 'w') as f:
+            f.write('{"query"')
+        with self.assertRaises(ui.UserError):
+            self.run_command('userrating', '--resume')
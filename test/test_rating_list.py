@@ -0,0 +1,49 @@
+import json
+import unittest
+
+from test.helper import TestHelper, capture_stdout
+
+
+class RatingListTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        for title, values in (('high', {'userrating': 9}), ('low', {'userrating': 2}),
+                              ('external', {'externalrating': 6}), ('none', {}), ('zero', {'userrating': 0})):
+            item = self.add_item(artist='artist', title=title)
+            item.update(values)
+            item.store()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _titles(self, *args):
+        with capture_stdout() as output:
+            self.run_command('userrating', '--json', *args)
+        return [json.loads(line)['title'] for line in output.getvalue().splitlines()]
+
+    def test_unrated(self):
+        self.assertEqual(['external', 'none', 'zero'], self._titles('--unrated'))
+
+    def test_external_only(self):
+        self.assertEqual(['external'], self._titles('--external-only'))
+
+    def test_min_max(self):
+        self.assertEqual(['high'], self._titles('--min', '5'))
+        self.assertEqual(['low'], self._titles('--max', '5'))
+        self.assertEqual(['high', 'low'], self._titles('--min', '1', '--max', '10'))
+
+    def test_query(self):
+        self.assertEqual(['low'], self._titles('--min', '1', 'title:low'))
+        self.assertEqual(['high'], self._titles('userrating:9'))
+
+    def test_table(self):
+        with capture_stdout() as output:
+            self.run_command('userrating', '--min', '1')
+        self.assertEqual([u' 9  - artist - high', u' 2  - artist - low'], output.getvalue().splitlines())
+
+
+if __name__ == '__main__':
+    unittest.main()
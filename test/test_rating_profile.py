@@ -0,0 +1,32 @@
+import os
+import pstats
+import unittest
+
+from test.helper import TestHelper, capture_log
+
+
+class ProfileTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.add_item(title=u'track')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_profile(self):
+        path = os.path.join(self.temp_dir.decode(), 'userrating.pstats')
+        self.run_command('userrating', '--profile', path)
+        stats = pstats.Stats(path)
+        self.assertTrue(any(name == 'handle_tracks' for _, _, name in stats.stats))
+
+    def test_memprofile(self):
+        with capture_log() as logs:
+            self.run_command('ratingsfile', '--memprofile')
+        self.assertTrue(any('Peak memory' in line for line in logs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from beets import config
+
+from beetsplug.rating_progress import SKIPPED, WRITTEN, Progress
+from test.helper import TestHelper, capture_log
+
+
+class FakeLog(object):
+
+    def __init__(self):
+        self.messages = []
+
+    def info(self, message, *args):
+        self.messages.append(message.format(*args))
+
+
+class ProgressTest(unittest.TestCase):
+
+    def test_report_interval(self):
+        now = [100.0]
+        log = FakeLog()
+        progress = Progress(log, 10, interval=5.0, clock=lambda: now[0])
+        for outcome in (WRITTEN, SKIPPED, None, WRITTEN):
+            now[0] += 1.0
+            progress.update(outcome)
+        self.assertEqual([], log.messages)
+        now[0] += 1.0
+        progress.update(WRITTEN)
+        self.assertEqual([u'5/10 processed, 1 skipped, 3 written, 1 items/s, ETA 0:05'], log.messages)
+
+
+class HandleTracksProgressTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.items = self.add_item_fixtures('mp3', count=3)
+        self.items[0].userrating = 4
+        self.items[0].store()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_summary_without_per_item_logs(self):
+        config['verbose'] = 0
+        with capture_log() as logs:
+            self.run_command('userrating', '-u', '7')
+        self.assertTrue(any('3/3 processed, 1 skipped, 2 written' in line for line in logs))
+        self.assertFalse(any('Applied rating' in line for line in logs))
+
+    def test_verbose_per_item_logs(self):
+        with capture_log() as logs:
+            self.run_command('userrating', '-u', '7')
+        self.assertTrue(any('Applied rating' in line for line in logs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from beets import config
+
+from beetsplug.rating_query import create_rating_indexes
+from test.helper import TestHelper
+
+
+class RatingQueryTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.items = []
+        for rating in (None, 0, 4, 8, 10):
+            item = self.add_item()
+            item.userrating = rating
+            item.store()
+            self.items.append(item)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _ratings(self, query):
+        return [item.get('userrating') for item in self.lib.items(query)]
+
+    def test_range_query_without_index(self):
+        self.assertEqual([8, 10], sorted(self._ratings('userrating:5..')))
+        self.assertEqual([0, 4], sorted(self._ratings('userrating:..4')))
+
+    def test_range_query_with_index(self):
+        config['userrating']['index'] = True
+        create_rating_indexes(self.lib)
+        self.assertEqual([8, 10], sorted(self._ratings('userrating:5..')))
+        self.assertEqual([4], self._ratings('userrating:..4'))
+        self.assertEqual([10], self._ratings('userrating:10'))
+        with self.lib.transaction() as tx:
+            plan = ' '.join(str(tuple(row)) for row in tx.query(
+                'EXPLAIN QUERY PLAN SELECT entity_id FROM item_attributes '
+                'WHERE key = \'userrating\' AND CAST(value AS INTEGER) >= 5'))
+        self.assertIn('item_attributes_by_userrating', plan)
+
+    def test_sort_with_index(self):
+        config['userrating']['index'] = True
+        self.assertEqual([10, 8, 4], self._ratings('userrating:1.. userrating-'))
+        self.assertEqual([4, 8, 10], self._ratings('userrating+')[2:])
@@ -0,0 +1,48 @@
+import unittest
+
+from beets import config
+
+from beetsplug.rating_ranking import ensure_ranking
+from test.helper import TestHelper
+
+
+class PlaylistTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        config['userrating']['playlist_index'] = True
+        self.load_plugins('userrating')
+        self.items = {}
+        for artist, rating in (('a', 10), ('a', 8), ('a', 6), ('b', 4), ('b', None)):
+            item = self.add_item(artist=artist, title=u'{0}{1}'.format(artist, rating))
+            item.userrating = rating
+            item.store()
+            self.items[item.title] = item
+        # Built from the existing ratings
+        ensure_ranking(self.lib)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _playlist(self, *args):
+        output = self.run_with_output('userrating', '--playlist', *args)
+        titles = {item.path.decode(): title for title, item in self.items.items()}
+        return [titles[path] for path in output.splitlines()]
+
+    def test_min_rating(self):
+        self.assertEqual(['a10', 'a8'], self._playlist())
+        self.assertEqual(['a10', 'a8', 'a6'], self._playlist('--min', '5'))
+
+    def test_top_with_min_rating(self):
+        self.assertEqual(['a10'], self._playlist('--min', '7', '--top', '1'))
+
+    def test_top_per_artist_is_kept_up_to_date(self):
+        self.assertEqual(['a10', 'a8', 'b4'], self._playlist('--min', '1', '--top', '2'))
+        item = self.items['bNone']
+        item.userrating = 9
+        item.store()
+        item = self.items['a10']
+        item.userrating = None
+        item.store()
+        self.assertEqual(['a8', 'a6', 'bNone', 'b4'], self._playlist('--min', '1', '--top', '2'))
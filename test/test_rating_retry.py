@@ -0,0 +1,49 @@
+import os
+import shutil
+import unittest
+
+from beets import config
+
+from beetsplug.rating_retry import RetryQueue
+from test.helper import TestHelper
+
+
+class RetryQueueTest(unittest.TestCase):
+
+    def test_backoff_doubles_on_each_failure(self):
+        queue = RetryQueue('/nonexistent/userrating.retry', backoff=10, max_backoff=25)
+        queue.add(1, 'locked', now=100)
+        self.assertEqual([], queue.due(now=109))
+        self.assertEqual([1], queue.due(now=110))
+        queue.add(1, 'still locked', now=110)
+        self.assertEqual(130, queue.entries[1]['next_attempt'])
+        queue.add(1, 'still locked', now=130)
+        self.assertEqual(155, queue.entries[1]['next_attempt'])
+        self.assertEqual(3, queue.entries[1]['attempts'])
+        queue.remove(1)
+        self.assertEqual(0, len(queue))
+
+
+class RetryFailedTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        config['userrating']['retry_backoff'] = 0
+        self.load_plugins('userrating')
+        self.item = self.add_item_fixtures(ext='mp3')[0]
+        self.queue_path = os.path.join(config.config_dir(), 'userrating.retry')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_failed_write_is_queued_and_retried(self):
+        path = self.item.path.decode()
+        shutil.move(path, path + '.offline')
+        self.run_with_output('userrating', '-u', '6')
+        self.assertEqual(6, self.lib.get_item(self.item.id).userrating)
+        self.assertEqual([self.item.id], RetryQueue(self.queue_path).due())
+
+        shutil.move(path + '.offline', path)
+        self.run_with_output('userrating', '--retry-failed')
+        self.assertFalse(os.path.exists(self.queue_path))
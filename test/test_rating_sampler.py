@@ -0,0 +1,55 @@
+import random
+import unittest
+
+from beets import config
+
+from beetsplug.rating_sampler import AliasTable, RatingSampler
+from test.helper import TestHelper
+
+
+class AliasTableTest(unittest.TestCase):
+
+    def test_draws_follow_weights(self):
+        table = AliasTable([1, 0, 3])
+        rng = random.Random(42)
+        counts = [0, 0, 0]
+        for _ in range(20000):
+            counts[table.draw(rng)] += 1
+        self.assertEqual(0, counts[1])
+        self.assertAlmostEqual(3.0, counts[2] / float(counts[0]), delta=0.2)
+
+
+class RandomCommandTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        config['userrating']['random_weights'] = {2: 0}
+        self.load_plugins('userrating')
+        for rating in (None, 2, 6, 10):
+            item = self.add_item(title=u'rated {0}'.format(rating))
+            item.userrating = rating
+            item.store()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_only_weighted_tracks_are_drawn(self):
+        output = self.run_with_output('userrating', '--random', '5')
+        self.assertEqual(2, len(output.splitlines()))
+        self.assertIn(u'rated 6', output)
+        self.assertIn(u'rated 10', output)
+
+    def test_sample_with_skewed_weights(self):
+        sampler = RatingSampler(self.lib, {6: 1e-12, 10: 1e12})
+        rng = random.Random(42)
+        self.assertEqual(2, len(set(sampler.sample(5, rng))))
+        firsts = [sampler.sample(1, rng)[0] for _ in range(100)]
+        self.assertEqual(1, len(set(firsts)))
+
+    def test_sample_follows_weights(self):
+        sampler = RatingSampler(self.lib, {6: 1, 10: 3})
+        rng = random.Random(42)
+        firsts = [self.lib.get_item(sampler.sample(1, rng)[0]).userrating for _ in range(4000)]
+        self.assertAlmostEqual(3.0, firsts.count(10) / float(firsts.count(6)), delta=0.3)
+        self.assertEqual({6, 10}, set(self.lib.get_item(item_id).userrating for item_id in sampler.sample(2, rng)))
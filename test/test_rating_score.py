@@ -0,0 +1,49 @@
+import unittest
+
+from beets import config
+
+from beetsplug import rating_score
+from test.helper import TestHelper
+
+
+class ScoreTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        config['userrating']['score_weights'] = {'userrating': 0.5, 'rating': 0, 'play_count': 0.5,
+                                                 'skip_count': -1}
+        self.load_plugins('userrating')
+        self.items = []
+        for values in ({'userrating': 10, 'play_count': 9}, {'userrating': 4, 'play_count': 1, 'skip_count': 1},
+                       {}):
+            item = self.add_item()
+            item.update(values)
+            item.store()
+            self.items.append(item)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _scores(self):
+        return [self.lib.get_item(item.id).get('score') for item in self.items]
+
+    def _assert_scores(self):
+        for expected, score in zip([1.0, 0.2 + 0.5 * 0.301 - 0.5, 0.25], self._scores()):
+            self.assertAlmostEqual(expected, score, places=3)
+
+    def test_score(self):
+        self.run_command('userrating', '--score')
+        self._assert_scores()
+
+    def test_score_without_numpy(self):
+        numpy, rating_score.numpy = rating_score.numpy, None
+        try:
+            self.run_command('userrating', '--score')
+        finally:
+            rating_score.numpy = numpy
+        self._assert_scores()
+
+    def test_score_query(self):
+        self.run_command('userrating', '--score', 'userrating:10')
+        self.assertEqual([1.0, None, None], self._scores())
@@ -0,0 +1,90 @@
+import threading
+import unittest
+from unittest import mock
+
+import beets.plugins
+from beets import config, ui
+
+from beetsplug.rating_session import WriteBehind, prefetched
+from test.helper import TestHelper, capture_stdout, control_stdin
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_prefetched(self):
+        threads = set()
+
+        def load(value):
+            threads.add(threading.current_thread())
+            return value * 2
+
+        self.assertEqual([(i, i * 2) for i in range(12)], list(prefetched(range(12), load, ahead=3)))
+        self.assertNotIn(threading.current_thread(), threads)
+
+
+class WriteBehindTest(unittest.TestCase):
+
+    def test_results_in_order(self):
+        def write(value):
+            if value == 2:
+                raise OSError('disk full')
+            if value == 3:
+                raise KeyError('bug')
+
+        writer = WriteBehind(write)
+        for value in range(5):
+            writer.submit(value)
+        results = writer.close()
+        self.assertEqual([(0,), (1,), (2,), (3,), (4,)], [args for args, _ in results])
+        self.assertEqual([None, None, 'disk full', "'bug'", None], [error and str(error) for _, error in results])
+
+
+class AskRatingsTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_ask(self):
+        items = self.add_item_fixtures('mp3', count=3)
+        with control_stdin('\n'.join(['7', 's', '3'])):
+            with capture_stdout():
+                self.run_command('userrating', '--ask')
+        ratings = [self.lib.get_item(item.id).get('userrating') for item in items]
+        self.assertEqual([7, None, 3], ratings)
+        for item in (items[0], items[2]):
+            stored = self.lib.get_item(item.id)
+            self.assertEqual(stored.current_mtime(), stored.mtime)
+
+    def test_quit(self):
+        items = self.add_item_fixtures('mp3', count=2)
+        with control_stdin('\n'.join(['q'])):
+            with capture_stdout():
+                self.run_command('userrating', '--ask')
+        self.assertEqual([None, None], [self.lib.get_item(item.id).get('userrating') for item in items])
+
+    def test_no_write(self):
+        items = self.add_item_fixtures('mp3', count=1)
+        config['import']['write'] = False
+        plugin = beets.plugins.find_plugins()[0]
+        with mock.patch.object(plugin, 'write_file') as write_file:
+            with control_stdin('6'):
+                with capture_stdout():
+                    self.run_command('userrating', '--ask')
+        self.assertEqual(6, self.lib.get_item(items[0].id).userrating)
+        self.assertFalse(write_file.called)
+
+    def test_unsupported_storage_rejected_before_asking(self):
+        config['userrating']['storage'] = 'xattr'
+        self.add_item_fixtures('mp3', count=1)
+        with mock.patch('beetsplug.userrating.xattr_supported', return_value=False):
+            with self.assertRaises(ui.UserError):
+                self.run_command('userrating', '--ask')
+
+
+if __name__ == '__main__':
+    unittest.main()
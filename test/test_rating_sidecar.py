@@ -0,0 +1,49 @@
+import os
+import unittest
+
+import beets.plugins
+from beets import config
+
+from beetsplug.rating_sidecar import SIDECAR_NAME, read_sidecar
+from test.helper import TestHelper
+
+
+class SidecarStorageTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        config['userrating']['storage'] = 'sidecar'
+        self.load_plugins('userrating')
+        self.items = list(self.add_album_fixture(track_count=2, ext='mp3').items())
+        self.directory = os.path.dirname(self.items[0].path)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_update_writes_one_sidecar(self):
+        mtime = os.path.getmtime(self.items[0].path)
+        self.run_command('userrating', '-u', '6')
+        self.assertEqual({os.path.basename(item.path): 6 for item in self.items}, read_sidecar(self.directory))
+        self.assertEqual(mtime, os.path.getmtime(self.items[0].path))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, SIDECAR_NAME + b'.tmp')))
+
+    def test_import_from_sidecar(self):
+        with open(os.path.join(self.directory, SIDECAR_NAME), 'wb') as f:
+            f.write(b'8\t' + os.path.basename(self.items[1].path) + b'\n')
+        self.run_command('userrating', '-i')
+        self.assertEqual([None, 8], [self.lib.get_item(item.id).get('userrating') for item in self.items])
+
+    def test_import_leaves_sidecar_alone(self):
+        path = os.path.join(self.directory, SIDECAR_NAME)
+        with open(path, 'wb') as f:
+            f.write(b'8\t' + os.path.basename(self.items[1].path) + b'\n')
+        inode = os.stat(path).st_ino
+        self.run_command('userrating', '-i')
+        self.assertEqual(inode, os.stat(path).st_ino)
+        self.assertEqual(0, len(beets.plugins.find_plugins()[0].retry_queue()))
+
+    def test_malformed_line_is_skipped(self):
+        with open(os.path.join(self.directory, SIDECAR_NAME), 'wb') as f:
+            f.write(b'x\ta.mp3\n6\tb.mp3\n')
+        self.assertEqual({b'b.mp3': 6}, read_sidecar(self.directory))
@@ -0,0 +1,50 @@
+import json
+import unittest
+
+from beets import ui
+
+from test.helper import TestHelper, capture_stdout
+
+
+class RatingStatsTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        for artist, values in (('a', {'userrating': 8}), ('a', {'userrating': 4}),
+                               ('a', {'externalrating': 6}), ('b', {})):
+            item = self.add_item(artist=artist)
+            item.update(values)
+            item.store()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_stats_json(self):
+        with capture_stdout() as output:
+            self.run_command('userrating', '--stats-by', 'artist', '--json')
+        stats = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(['a', 'b'], [group['artist'] for group in stats])
+        self.assertEqual(3, stats[0]['tracks'])
+        self.assertEqual(2, stats[0]['rated'])
+        self.assertEqual(1, stats[0]['external_only'])
+        self.assertEqual(6.0, stats[0]['mean'])
+        self.assertEqual({'4': 1, '8': 1}, stats[0]['histogram'])
+        self.assertEqual(0, stats[1]['rated'])
+        self.assertIsNone(stats[1]['mean'])
+
+    def test_stats_text(self):
+        with capture_stdout() as output:
+            self.run_command('userrating', '--stats-by', 'artist')
+        self.assertEqual([u'a: 2 of 3 rated, 1 by other players only, mean 6.0, histogram 4:1 8:1',
+                          u'b: 0 of 1 rated, 0 by other players only'],
+                         output.getvalue().splitlines())
+
+    def test_invalid_field(self):
+        with self.assertRaises(ui.UserError):
+            self.run_command('userrating', '--stats-by', 'artist; DROP TABLE items')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import shutil
+import unittest
+
+from beets import config
+from mediafile import MediaFile
+from mutagen.mp4 import MP4FreeForm
+
+from beetsplug.rating_styles import DefaultValueStorageStyle, MP4RatingStorageStyle, VorbisRatingStorageStyle
+from test.helper import TestHelper
+
+
+class FakeMP4(dict):
+    """
+    Stands for a mutagen MP4 file, whose tags are a dict of atom lists.
+    """
+
+    @property
+    def tags(self):
+        return self
+
+
+class MP4RatingStorageStyleTest(unittest.TestCase):
+
+    def test_get(self):
+        style = MP4RatingStorageStyle(_is_external=True)
+        self.assertIsNone(style.get(FakeMP4()))
+        self.assertEqual(8, style.get(FakeMP4(rate=[u'80'])))
+        self.assertEqual(6, style.get(FakeMP4({'----:com.apple.iTunes:RATING': [MP4FreeForm(b'60')]})))
+
+    def test_get_invalid(self):
+        style = MP4RatingStorageStyle(_is_external=True)
+        self.assertIsNone(style.get(FakeMP4(rate=[u'abc'])))
+        self.assertEqual(6, style.get(FakeMP4({'rate': [u'abc'], '----:com.apple.iTunes:RATING': [MP4FreeForm(b'60')]})))
+        self.assertIsNone(style.get(FakeMP4({'----:com.apple.iTunes:RATING': [MP4FreeForm(b'\xff')]})))
+
+    def test_set(self):
+        mp4 = FakeMP4({'----:com.apple.iTunes:RATING': [MP4FreeForm(b'60')]})
+        MP4RatingStorageStyle(_is_external=False).set(mp4, 7)
+        self.assertEqual([u'70'], mp4['rate'])
+        self.assertEqual([b'60'], mp4['----:com.apple.iTunes:RATING'])
+        # Only the atoms already there are updated for other players
+        MP4RatingStorageStyle(_is_external=True).set(mp4, 9)
+        self.assertEqual([u'90'], mp4['rate'])
+        self.assertEqual([b'90'], mp4['----:com.apple.iTunes:RATING'])
+
+
+class MP4FileTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.path = os.path.join(self.temp_dir, b'empty.m4a')
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'rsrc', 'empty.m4a'), self.path)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_roundtrip(self):
+        mediafile = MediaFile(self.path)
+        mediafile.userrating = 7
+        mediafile.save()
+        mediafile = MediaFile(self.path)
+        self.assertEqual([u'70'], mediafile.mgfile['rate'])
+        self.assertEqual(7, mediafile.userrating)
+        self.assertEqual(7, mediafile.externalrating)
+
+    def test_freeform_rating(self):
+        mediafile = MediaFile(self.path)
+        mediafile.mgfile['----:com.apple.iTunes:RATING'] = [MP4FreeForm(b'60')]
+        mediafile.save()
+        self.assertEqual(6, MediaFile(self.path).externalrating)
+
+    def test_invalid_rating(self):
+        mediafile = MediaFile(self.path)
+        mediafile.mgfile['rate'] = [u'abc']
+        mediafile.save()
+        mediafile = MediaFile(self.path)
+        self.assertIsNone(mediafile.userrating)
+        self.assertIsNone(mediafile.externalrating)
+
+
+class VorbisRatingStorageStyleTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.path = os.path.join(self.temp_dir, b'full.ogg')
+        shutil.copy(os.path.join(os.path.dirname(__file__), 'rsrc', 'full.ogg'), self.path)
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_roundtrip(self):
+        mediafile = MediaFile(self.path)
+        mediafile.userrating = 8
+        mediafile.save()
+        mediafile = MediaFile(self.path)
+        self.assertEqual([u'0.8'], mediafile.mgfile['FMPS_RATING'])
+        self.assertEqual(8, mediafile.userrating)
+        self.assertEqual(8, mediafile.externalrating)
+
+    def test_external_rating_comment(self):
+        mediafile = MediaFile(self.path)
+        mediafile.mgfile['RATING'] = [u'60']
+        mediafile.save()
+        self.assertEqual(6, MediaFile(self.path).externalrating)
+
+    def test_style_formats(self):
+        self.assertEqual(['OggVorbis', 'OggOpus'], VorbisRatingStorageStyle.formats)
+
+
+class DefaultValueStorageStyleTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.style = DefaultValueStorageStyle()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_zero_without_index(self):
+        self.assertEqual(0, self.style.get(FakeMP4()))
+
+    def test_none_with_index(self):
+        config['userrating']['index'] = True
+        self.assertIsNone(self.style.get(FakeMP4()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import beets.plugins
+
+from beetsplug.rating_watch import Debouncer, Inotify, ItemPaths
+from test.helper import TestHelper
+
+
+class DebouncerTest(unittest.TestCase):
+
+    def test_burst_is_released_once_quiet(self):
+        debouncer = Debouncer(2)
+        debouncer.add(b'/a.mp3', now=0)
+        debouncer.add(b'/a.mp3', now=1.5)
+        debouncer.add(b'/b.mp3', now=1)
+        self.assertEqual([b'/b.mp3'], debouncer.due(now=3))
+        self.assertEqual([b'/a.mp3'], debouncer.due(now=3.5))
+        self.assertEqual(0, len(debouncer))
+
+
+class InotifyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp().encode()
+        try:
+            self.inotify = Inotify()
+        except OSError:
+            shutil.rmtree(self.temp_dir)
+            self.skipTest(u'inotify not available')
+
+    def tearDown(self):
+        self.inotify.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_written_files_in_new_directories(self):
+        self.inotify.add_tree(self.temp_dir)
+        album = os.path.join(self.temp_dir, b'album')
+        os.mkdir(album)
+        self.assertEqual([], self.inotify.read(timeout=1))
+        path = os.path.join(album, b'track.mp3')
+        with open(path, 'wb') as f:
+            f.write(b'ID3')
+        self.assertEqual([path], self.inotify.read(timeout=1))
+
+
+class ItemPathsTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.item = self.add_item(path=b'/music/a.mp3')
+
+    def tearDown(self):
+        self.teardown_beets()
+
+    def test_unknown_paths_resolved_once_per_import(self):
+        item_paths = ItemPaths(self.lib)
+        self.assertEqual([self.item.id], item_paths.item_ids([b'/music/a.mp3', b'/music/cover.jpg']))
+        self.assertIn(b'/music/cover.jpg', item_paths._unknown)
+        new = self.add_item(path=b'/music/b.mp3')
+        self.assertEqual([new.id], item_paths.item_ids([b'/music/b.mp3', b'/music/cover.jpg']))
+        self.assertEqual({b'/music/cover.jpg'}, item_paths._unknown)
+
+
+class RereadRatingsTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.load_plugins('userrating')
+        self.plugin = beets.plugins.find_plugins()[0]
+        self.item = self.add_album_fixture(ext='mp3', filename='full-with-wmp-rating').items().get()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_changed_rating_is_stored(self):
+        self.item.externalrating = 2
+        self.item.userrating = 2
+        self.item.store()
+        self.plugin.reread_ratings(self.lib, [self.item.id])
+        item = self.lib.get_item(self.item.id)
+        self.assertEqual(8, item.externalrating)
+        self.assertEqual(8, item.userrating)
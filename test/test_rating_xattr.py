@@ -0,0 +1,74 @@
+import os
+import unittest
+from unittest import mock
+
+from beets import config, ui
+
+from beetsplug.rating_xattr import read_xattr_rating, write_xattr_rating, xattr_supported
+from test.helper import TestHelper
+
+
+def _xattr_writable(directory):
+    if not xattr_supported():
+        return False
+    path = os.path.join(directory, b'.xattr-probe')
+    open(path, 'w').close()
+    try:
+        write_xattr_rating(path, 1)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.remove(path)
+
+
+class XattrStorageTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        if not _xattr_writable(self.temp_dir):
+            self.teardown_beets()
+            self.skipTest(u'extended attributes not supported')
+        config['userrating']['storage'] = 'xattr'
+        self.load_plugins('userrating')
+        self.item = self.add_item_fixtures(ext='mp3')[0]
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def test_update_writes_xattr_only(self):
+        mtime = os.path.getmtime(self.item.path)
+        self.run_command('userrating', '-u', '6')
+        self.assertEqual(6, read_xattr_rating(self.item.path))
+        self.assertEqual(mtime, os.path.getmtime(self.item.path))
+        self.assertEqual(6, self.lib.get_item(self.item.id).userrating)
+
+    def test_import_from_xattr(self):
+        write_xattr_rating(self.item.path, 8)
+        self.run_command('userrating', '--from-xattr')
+        self.assertEqual(8, self.lib.get_item(self.item.id).userrating)
+
+
+class XattrUnsupportedTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.item = self.add_item(format=u'MP3')
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def check_rejected(self, option):
+        config['userrating'][option] = 'xattr'
+        self.load_plugins('userrating')
+        with mock.patch('beetsplug.userrating.xattr_supported', return_value=False):
+            with self.assertRaises(ui.UserError):
+                self.run_command('userrating', '-u', '6')
+
+    def test_storage_rejected(self):
+        self.check_rejected('storage')
+
+    def test_unsupported_storage_rejected(self):
+        self.check_rejected('unsupported_storage')
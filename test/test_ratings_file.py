@@ -0,0 +1,94 @@
+import os
+import unittest
+
+from beets import config
+from beets.util import path_as_posix
+
+from beetsplug.userrating import RelativePathCache
+
+from test.helper import TestHelper, capture_log
+
+
+class RatingsFileTest(TestHelper, unittest.TestCase):
+
+    def setUp(self):
+        self.setup_beets()
+        self.rating_dir = os.path.join(self.temp_dir, b'ratings')
+        config['userrating']['ratings_file'] = os.path.join(self.rating_dir, b'all.m3u8').decode()
+        self.load_plugins('userrating')
+        for artist, rating in ((u'a', 10), (u'b', 6), (u'b', 4)):
+            item = self.add_item(artist=artist, albumartist=artist,
+                                 path=os.path.join(self.libdir, artist.encode(), b'%d.mp3' % rating))
+            item.userrating = rating
+            item.store()
+
+    def tearDown(self):
+        self.teardown_beets()
+        self.unload_plugins()
+
+    def _read(self, name):
+        with open(os.path.join(self.rating_dir, name), 'rb') as f:
+            return f.read()
+
+    def test_write_ratings_file(self):
+        self.run_command('ratingsfile')
+        self.assertEqual(b'#EXT-X-RATING:5\n../libdir/a/10.mp3\n'
+                         b'#EXT-X-RATING:3\n../libdir/b/6.mp3\n'
+                         b'#EXT-X-RATING:2\n../libdir/b/4.mp3\n', self._read(b'all.m3u8'))
+
+    def test_unchanged_ratings_file_is_not_rewritten(self):
+        config['userrating']['ratings_file'] = os.path.join(self.rating_dir, b'all.%s.m3u8').decode()
+        self.run_command('ratingsfile')
+        published = os.listdir(self.rating_dir)
+        with capture_log() as logs:
+            self.run_command('ratingsfile')
+        self.assertEqual(published, os.listdir(self.rating_dir))
+        self.assertTrue(any(u'skipped' in log for log in logs))
+
+        item = self.lib.items().get()
+        item.userrating = 2
+        item.store()
+        with capture_log() as logs:
+            self.run_command('ratingsfile')
+        self.assertTrue(any(u'Wrote ratings' in log for log in logs))
+        self.assertEqual(1, len(os.listdir(self.rating_dir)))
+
+    def test_shard_by_directory(self):
+        config['userrating']['ratings_file_shard'] = 'directory'
+        self.run_command('ratingsfile')
+        self.assertEqual([b'all.a.m3u8', b'all.b.m3u8'], sorted(os.listdir(self.rating_dir)))
+        self.assertEqual(b'#EXT-X-RATING:5\n../libdir/a/10.mp3\n', self._read(b'all.a.m3u8'))
+
+    def test_shard_by_count_removes_stale_shards(self):
+        config['userrating']['ratings_file_shard'] = 'count'
+        config['userrating']['ratings_file_shard_size'] = 2
+        self.run_command('ratingsfile')
+        self.assertEqual([b'all.0000.m3u8', b'all.0001.m3u8'], sorted(os.listdir(self.rating_dir)))
+        config['userrating']['ratings_file_shard_size'] = 3
+        with open(os.path.join(self.rating_dir, b'all.backup.m3u8'), 'wb') as f:
+            f.write(b'mine')
+        self.run_command('ratingsfile')
+        self.assertEqual([b'all.0000.m3u8', b'all.backup.m3u8'], sorted(os.listdir(self.rating_dir)))
+
+    def test_shard_by_albumartist_with_separator(self):
+        config['userrating']['ratings_file_shard'] = 'albumartist'
+        item = self.add_item(albumartist=u'AC/DC', path=os.path.join(self.libdir, b'acdc.mp3'))
+        item.userrating = 8
+        item.store()
+        self.run_command('ratingsfile')
+        self.assertIn(b'all.AC_DC.m3u8', os.listdir(self.rating_dir))
+
+
+class RelativePathCacheTest(unittest.TestCase):
+
+    def test_same_as_relpath(self):
+        start = b'/music/playlists'
+        cache = RelativePathCache(start)
+        for path in (b'/music/playlists/a.mp3', b'/music/a/b.mp3', b'/music/a/c.mp3',
+                     b'/other/d.mp3', b'/music/playlists/sub/e.mp3'):
+            self.assertEqual(os.path.relpath(path, start), cache(path))
+
+    def test_forward_slash(self):
+        cache = RelativePathCache(b'/music/playlists', posix=True)
+        self.assertEqual(path_as_posix(os.path.relpath(b'/music/a/b.mp3', b'/music/playlists')),
+                         cache(b'/music/a/b.mp3'))